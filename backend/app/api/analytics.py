@@ -1,36 +1,66 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Query
-from pymongo import MongoClient
-from app.core.config import settings
-from app.api.analytics_service import aggregate_daily_summary, aggregate_summary_by_date_range
-from datetime import datetime, timedelta
+from app.database.database import get_daily_collection, get_overall_collection, get_temp_collection
+from app.api.analytics_service import (
+    aggregate_daily_summary, aggregate_overall_summary, aggregate_summary_by_date_range, save_daily_summary
+)
+from datetime import datetime
 from app.api.auth_jwt import verify_token 
 from app.helper.convertType import parse_json
+from app.database.async_collection import AsyncCollection
 from app.utils.performance_monitor import performance_monitor
+from app.utils.range_cache import get_range_cache
+from app.utils.single_flight import request_flight
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
-client = MongoClient(settings.MONGODB_URL)
-db = client[settings.MONGODB_DB_NAME]
-tempcollection = db[settings.MONGODB_TEMP_COLLECTION_NAME]
-daily_collection = db[settings.MONGODB_DAILY_SUMM_COLLECTION_NAME]
-overall_collection = db[settings.MONGODB_SUMM_COLLECTION_NAME]
-master_collection = db[settings.MONGODB_COLLECTION_NAME]
-
 @performance_monitor
 def generate_summary_report(auth: dict = Depends(verify_token)):
     try:
-        date_str = aggregate_daily_summary(tempcollection, daily_collection)
-        # aggregate_overall_summary(date_str, daily_collection, overall_collection)
+        daily_collection = get_daily_collection()
+        date_str = aggregate_daily_summary(get_temp_collection(), daily_collection)
+        aggregate_overall_summary(date_str, daily_collection, get_overall_collection())
+        invalidate_cached_ranges(date_str)
+        return {"message": "Summary generated successfully", "date": date_str}
+    except Exception as e:
+        logging.error(f"Error generating summary: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@performance_monitor
+def save_ingest_summary_report(accumulator, duplicate_tokens: list):
+    """Store the daily summary accumulated in-process during ingest."""
+    try:
+        # Same shape as reading tempTokens back with {'_id': 0}
+        duplicate_tokens = [{k: v for k, v in token.items() if k != "_id"} for token in duplicate_tokens]
+        daily_collection = get_daily_collection()
+        date_str = save_daily_summary(accumulator, daily_collection, duplicate_tokens)
+        aggregate_overall_summary(date_str, daily_collection, get_overall_collection())
+        invalidate_cached_ranges(date_str)
         return {"message": "Summary generated successfully", "date": date_str}
     except Exception as e:
         logging.error(f"Error generating summary: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
+def invalidate_cached_ranges(date_str: str):
+    range_cache = get_range_cache()
+    if range_cache is not None:
+        range_cache.invalidate_date(date_str)
+
+def cached_range_summary(start_dt: datetime, end_dt: datetime):
+    range_cache = get_range_cache()
+    if range_cache is None:
+        return parse_json(aggregate_summary_by_date_range(get_daily_collection(), start_dt, end_dt, get_overall_collection()))
+    result = range_cache.get(start_dt, end_dt)
+    if result is None:
+        generation = range_cache.generation
+        result = parse_json(aggregate_summary_by_date_range(get_daily_collection(), start_dt, end_dt, get_overall_collection()))
+        range_cache.set(start_dt, end_dt, result, generation)
+    return result
+
 @router.get("/latest-date", tags=["Analytics"])
 async def get_latest_date(auth : dict = Depends(verify_token)):
     """Get the date of the most recent daily summary"""
-    latest_doc = daily_collection.find_one(
+    latest_doc = await AsyncCollection(get_daily_collection()).find_one(
         {}, 
         sort=[("date", -1)],
         projection={"date": 1, "_id": 0}
@@ -73,8 +103,8 @@ async def get_analytics(
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
             
-            result = aggregate_summary_by_date_range(daily_collection, start_dt, end_dt)
-            return parse_json(result)
+            # Identical concurrent requests share one computation
+            return await request_flight.run(("analytics", start_dt, end_dt), cached_range_summary, start_dt, end_dt)
 
         # Handle date range
         if ":" in date:
@@ -86,11 +116,11 @@ async def get_analytics(
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
             
-            result = aggregate_summary_by_date_range(daily_collection, start_dt, end_dt)
-            return parse_json(result)
+            # Identical concurrent requests share one computation
+            return await request_flight.run(("analytics", start_dt, end_dt), cached_range_summary, start_dt, end_dt)
 
         # Handle single date
-        doc = daily_collection.find_one(
+        doc = await AsyncCollection(get_daily_collection()).find_one(
             {"date": date},
             {"_id": 0, "summary": 1}
         )
@@ -103,6 +133,14 @@ async def get_analytics(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/cache-stats")
+async def get_cache_stats(auth: dict = Depends(verify_token)):
+    """Hit, miss, eviction and invalidation counts of the range summary cache"""
+    range_cache = get_range_cache()
+    if range_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **range_cache.stats()}
+
 @router.get("/performance-bubble")
 async def get_performance_bubble_data(
     date: str = Query(..., description="Date filter - YYYY-MM-DD:YYYY-MM-DD or YYYY-MM-DD"),
@@ -110,153 +148,41 @@ async def get_performance_bubble_data(
 ):
     """Get performance bubble chart data with frequency aggregation"""
     try:
-        match_stage = {}
-        if date.lower() != "all":
-            if ":" in date:
-                try: 
-                    start_date, end_date = date.split(":")
-                    start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-                    end_dt = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
-                    match_stage["Request_timestamp"] = {"$gte": start_dt, "$lt": end_dt}
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD:YYYY-MM-DD")
-            else:
-                try:
-                    filter_date = datetime.strptime(date, "%Y-%m-%d")
-                    start_date = filter_date
-                    end_date = filter_date + timedelta(days=1)
-                    match_stage["Request_timestamp"] = {"$gte": start_date, "$lt": end_date}
-                except ValueError:
-                    raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-
-        # Aggregation pipeline for bubble chart data
-        pipeline = [
-            {"$match": match_stage},
-            {"$project": {
-                "processingTime": "$Time_to_Transaction_secs",
-                "numberOfInputs": "$NumberOfInputs", 
-                "numberOfOutputs": "$NumberOfOutputs",
-                "transactionId": "$Transaction_Id",
-                "amount": "$Amount",
-                "operation": "$Operation",
-                "type": "$Type_Of_Transaction",
-                "result": "$Result_of_Transaction"
-            }},
-            {"$match": {
-                "processingTime": {"$exists": True, "$ne": None},
-                "numberOfInputs": {"$exists": True, "$ne": None},
-                "numberOfOutputs": {"$exists": True, "$ne": None}
-            }}
-        ]
-
-        # Execute aggregation
-        raw_data = list(master_collection.aggregate(pipeline))
-        
-        # Process data for bubble chart
-        processed_data = process_bubble_data(raw_data)
-        processed_data = parse_json(processed_data)
-
-        return {
-            "inputsBubble": processed_data["inputs_bubble"],
-            "outputsBubble": processed_data["outputs_bubble"],
-            "statistics": processed_data["stats"],
-            "totalTransactions": len(raw_data)
-        }
+        if date.lower() == "all":
+            start_date, end_date = "2020-01-01", "2030-01-01"
+        elif ":" in date:
+            start_date, end_date = date.split(":")
+        else:
+            start_date = end_date = date
+        try:
+            start_dt = datetime.strptime(start_date, "%Y-%m-%d")
+            end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD:YYYY-MM-DD or YYYY-MM-DD")
+
+        # Same computation, cache entry and flight as /analytics for the range
+        try:
+            summary = await request_flight.run(("analytics", start_dt, end_dt), cached_range_summary, start_dt, end_dt)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            summary = {}
+        return performance_bubble_data(summary)
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Performance bubble data failed: {str(e)}")
 
-def process_bubble_data(raw_data):
-    """Process raw data for bubble charts with frequency aggregation"""
-    import numpy as np
-    from collections import defaultdict
-
-    # Aggregate data by input/output count
-    inputs_aggregation = defaultdict(lambda: {
-        'count': 0,
-        'total_processing_time': 0,
-        'processing_times': [],
-        'transactions': [],
-        'operations': defaultdict(int)
-    })
-    
-    outputs_aggregation = defaultdict(lambda: {
-        'count': 0, 
-        'total_processing_time': 0,
-        'processing_times': [],
-        'transactions': [],
-        'operations': defaultdict(int)
-    })
-
-    # Process each transaction
-    for item in raw_data:
-        processing_time = item["processingTime"]
-        num_inputs = item["numberOfInputs"] 
-        num_outputs = item["numberOfOutputs"]
-
-        # Aggregate for inputs
-        inputs_aggregation[num_inputs]['count'] += 1
-        inputs_aggregation[num_inputs]['total_processing_time'] += processing_time
-        inputs_aggregation[num_inputs]['processing_times'].append(processing_time)
-
-        # Aggregate for outputs  
-        outputs_aggregation[num_outputs]['count'] += 1
-        outputs_aggregation[num_outputs]['total_processing_time'] += processing_time
-        outputs_aggregation[num_outputs]['processing_times'].append(processing_time)
-
-    # Convert to bubble chart format
-    inputs_bubble = []
-    outputs_bubble = []
-
-    for input_count, data in inputs_aggregation.items():
-        avg_processing_time = data['total_processing_time'] / data['count']
-        processing_times = data['processing_times']
-        
-        inputs_bubble.append({
-            'x': input_count,
-            'y': avg_processing_time,
-            'size': data['count'],
-            'frequency': data['count'],
-            'avgProcessingTime': avg_processing_time,
-            'minProcessingTime': min(processing_times),
-            'maxProcessingTime': max(processing_times),
-        })
-
-    for output_count, data in outputs_aggregation.items():
-        avg_processing_time = data['total_processing_time'] / data['count']
-        processing_times = data['processing_times']
-        
-        outputs_bubble.append({
-            'x': output_count,
-            'y': avg_processing_time, 
-            'size': data['count'],
-            'frequency': data['count'],
-            'avgProcessingTime': avg_processing_time,
-            'minProcessingTime': min(processing_times),
-            'maxProcessingTime': max(processing_times)
-        })
-
-    # Calculate overall statistics
-    all_processing_times = [item["processingTime"] for item in raw_data]
-    all_input_counts = [item["numberOfInputs"] for item in raw_data]
-    all_output_counts = [item["numberOfOutputs"] for item in raw_data]
-
-    stats = {
-        'avgProcessingTime': np.mean(all_processing_times),
-        'maxProcessingTime': np.max(all_processing_times),
-        'minProcessingTime': np.min(all_processing_times),
-        'avgInputs': np.mean(all_input_counts),
-        'maxInputs': np.max(all_input_counts),
-        'avgOutputs': np.mean(all_output_counts), 
-        'maxOutputs': np.max(all_output_counts),
-        'totalUniqueInputCounts': len(inputs_aggregation),
-        'totalUniqueOutputCounts': len(outputs_aggregation),
-        'mostFrequentInputCount': max(inputs_aggregation.items(), key=lambda x: x[1]['count'])[0],
-        'mostFrequentOutputCount': max(outputs_aggregation.items(), key=lambda x: x[1]['count'])[0]
-    }
-
+def performance_bubble_data(summary: dict):
+    """
+    Bubble chart data of a range summary, which merges the per-day bubble
+    moments (through the rollups) instead of reading every transaction.
+    """
+    inputs_bubble = summary.get("inputsBubble", [])
     return {
-        'inputs_bubble': inputs_bubble,
-        'outputs_bubble': outputs_bubble,
-        'stats': stats
+        "inputsBubble": inputs_bubble,
+        "outputsBubble": summary.get("outputsBubble", []),
+        "statistics": summary.get("performanceStatistics", {}),
+        "totalTransactions": sum(bubble["frequency"] for bubble in inputs_bubble)
     }
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, HTTPException, Form, Response, Request
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from datetime import timedelta
 from jose import jwt, JWTError
 import bcrypt
-from pymongo import MongoClient
-from app.core.config import settings
+from app.database.database import get_login_collection
 from app.api.auth_jwt import (
     create_access_token, create_refresh_token,
     ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS,
@@ -13,11 +13,6 @@ from app.api.auth_jwt import (
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
-# MongoDB connection (only for login validation)
-client = MongoClient(settings.MONGODB_URL)
-db = client[settings.MONGODB_DB_NAME]
-login_collection = db[settings.MONGODB_LOGIN]
-
 # Login response model
 class LoginResponse(BaseModel):
     access_token: str
@@ -26,7 +21,7 @@ class LoginResponse(BaseModel):
 # Authenticate user using DB
 def authenticate_user(username: str, password: str):
     print(f"[DEBUG] Authenticating user: {username}")
-    user_data = login_collection.find_one({"_id": username})
+    user_data = get_login_collection().find_one({"_id": username})
     if not user_data:
         print("[ERROR] User not found.")
         return None
@@ -48,7 +43,8 @@ async def login(
     username: str = Form(...),
     password: str = Form(...)
 ):
-    user = authenticate_user(username, password)
+    # bcrypt and the user lookup both block, so keep them off the event loop
+    user = await run_in_threadpool(authenticate_user, username, password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
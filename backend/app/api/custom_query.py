@@ -5,8 +5,7 @@ from pydantic import BaseModel
 from enum import Enum
 from app.api.auth_jwt import verify_token
 from app.helper.convertType import parse_json
-from app.core.config import settings
-from pymongo import MongoClient
+from app.database.async_collection import AsyncCollection
 
 class Type(str, Enum):
     LOAD = "LOAD"
@@ -26,9 +25,6 @@ class NumericFilter(BaseModel):
     operator: str  # "gt", "lt", "eq", "gte", "lte"
     value: float
 
-client = MongoClient(settings.MONGODB_URL)
-db = client[settings.MONGODB_DB_NAME]
-
 router = APIRouter(prefix="/custom", tags=["Query"])
 
 @router.get("/filtered-transactions")
@@ -168,9 +164,9 @@ async def get_filtered_transactions(
             ])
         
         from app.database.database import get_collection
-        master_collection = get_collection()
+        master_collection = AsyncCollection(get_collection())
         try:
-            results = list(master_collection.aggregate(pipeline))
+            results = await master_collection.aggregate(pipeline).to_list()
         except Exception as db_error:
             raise HTTPException(status_code=500, detail=f"Database query failed: {str(db_error)}")
         
@@ -183,7 +179,7 @@ async def get_filtered_transactions(
         count_pipeline.append({"$count": "total"})
         
         try:
-            total_count = list(master_collection.aggregate(count_pipeline))
+            total_count = await master_collection.aggregate(count_pipeline).to_list()
             total = total_count[0]["total"] if total_count else 0
         except Exception:
             total = len(results)  # Fallback to result count
@@ -1,19 +1,13 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
-from pymongo import MongoClient
 from typing import Optional
 import re
 from datetime import datetime, timedelta
 from app.api.auth_jwt import verify_token
-from app.core.config import settings
-from app.database.database import get_collection
+from app.database.database import get_collection, get_tokens_collection
+from app.database.async_collection import AsyncCollection
 
 router = APIRouter(prefix="/api/search", tags=["search"])
 
-client = MongoClient(settings.MONGODB_URL)
-db = client[settings.MONGODB_DB_NAME]
-tokens_collection = db[settings.MONGODB_TOKENS_COLLECTION_NAME]
-master_collection = db[settings.MONGODB_COLLECTION_NAME]
-
 @router.get("/tokens")
 async def search_tokens(
     query: str = Query(..., min_length=1, description="Search query for token ID"),
@@ -24,6 +18,7 @@ async def search_tokens(
 ):
     """Search tokens by tokenId with expanded occurrences."""
     try:
+        tokens_collection = AsyncCollection(get_tokens_collection())
         pipeline = []
         match_stage = {}
 
@@ -52,7 +47,7 @@ async def search_tokens(
 
         # Count total results
         count_pipeline = pipeline + [{"$count": "total"}]
-        total_result = list(tokens_collection.aggregate(count_pipeline))
+        total_result = await tokens_collection.aggregate(count_pipeline).to_list()
         total = total_result[0]["total"] if total_result else 0
 
         # Sorting and pagination
@@ -63,7 +58,7 @@ async def search_tokens(
         ])
 
         # Execute search
-        results = list(tokens_collection.aggregate(pipeline))
+        results = await tokens_collection.aggregate(pipeline).to_list()
 
         # Format results
         processed_results = [
@@ -102,6 +97,7 @@ async def search_serial_numbers(
 ):
     """Search by serial number within occurrences."""
     try:
+        tokens_collection = AsyncCollection(get_tokens_collection())
         pipeline = []
         match_stage = {}
 
@@ -131,7 +127,7 @@ async def search_serial_numbers(
 
         # Count total results
         count_pipeline = pipeline + [{"$count": "total"}]
-        total_result = list(tokens_collection.aggregate(count_pipeline))
+        total_result = await tokens_collection.aggregate(count_pipeline).to_list()
         total = total_result[0]["total"] if total_result else 0
 
         # Sorting and pagination
@@ -142,7 +138,7 @@ async def search_serial_numbers(
         ])
 
         # Execute search
-        results = list(tokens_collection.aggregate(pipeline))
+        results = await tokens_collection.aggregate(pipeline).to_list()
 
         # Format results
         processed_results = [
@@ -181,6 +177,7 @@ async def search_transactions(
 ):
     """Search transactions by Transaction_Id in the master timeseries collection."""
     try:
+        master_collection = AsyncCollection(get_collection())
         match_stage = {}
         pipeline = []
 
@@ -202,7 +199,7 @@ async def search_transactions(
 
         # Count total results
         count_pipeline = pipeline + [{"$count": "total"}]
-        total_result = list(master_collection.aggregate(count_pipeline))
+        total_result = await master_collection.aggregate(count_pipeline).to_list()
         total = total_result[0]["total"] if total_result else 0
 
         # Sorting and pagination
@@ -213,7 +210,7 @@ async def search_transactions(
         ])
 
         # Execute search
-        results = list(master_collection.aggregate(pipeline))
+        results = await master_collection.aggregate(pipeline).to_list()
 
         # Format results
         processed_results = [
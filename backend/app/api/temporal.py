@@ -1,7 +1,12 @@
 # backend/app/routers/temporal.py
 from fastapi import APIRouter, HTTPException, Query
-from datetime import datetime
-from app.database.database import get_daily_collection
+from datetime import datetime, timedelta
+from app.database.database import get_daily_collection, get_collection
+from app.api.analytics_service import get_hour_interval_stats
+from app.database.async_collection import AsyncCollection
+from app.core.config import settings
+from app.utils.single_flight import request_flight
+from app.utils.time_bucketing import GRANULARITIES, TimeBuckets
 
 router = APIRouter(prefix="/temporal", tags=["temporal"])
 
@@ -24,7 +29,7 @@ async def get_temporal(
     if from_dt > to_dt:
         raise HTTPException(status_code=400, detail="from_date must be <= to_date")
 
-    coll = get_daily_collection()
+    coll = AsyncCollection(get_daily_collection())
 
     # We assume documents have a field "date" stored as string "YYYY-MM-DD".
     # If stored as a Date type, you can query by ISODate and convert to string.
@@ -55,3 +60,44 @@ async def get_temporal(
         }
         results.append(entry)
     return {"data": results}
+
+@router.get("/intervals")
+async def get_temporal_intervals(
+    from_date: str = Query(..., description="Start date in YYYY-MM-DD"),
+    to_date:   str = Query(..., description="End date in YYYY-MM-DD"),
+    granularity: str = Query("hour", description=f"One of {', '.join(GRANULARITIES)}"),
+    tz: str = Query("UTC", description="IANA timezone the buckets and dates are aligned to"),
+):
+    """
+    Transaction counts and amounts per calendar-aligned time bucket between
+    from_date and to_date (inclusive, in `tz`), bucketed in the database.
+    """
+    try:
+        from_dt = datetime.strptime(from_date, "%Y-%m-%d").date()
+        to_dt = datetime.strptime(to_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+
+    if from_dt > to_dt:
+        raise HTTPException(status_code=400, detail="from_date must be <= to_date")
+
+    try:
+        time_buckets = TimeBuckets(granularity, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    start = time_buckets.day_start(from_dt)
+    end = time_buckets.day_start(to_dt + timedelta(days=1))
+    bucket_count = time_buckets.count_between(start, end)
+    if bucket_count > settings.TEMPORAL_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans {bucket_count} {granularity} buckets, more than {settings.TEMPORAL_MAX_BUCKETS}; "
+                   f"use a shorter range or a coarser granularity"
+        )
+
+    match = {"Request_timestamp": {"$gte": start, "$lt": end}}
+    # Aggregated in the threadpool; identical concurrent requests share one aggregation
+    key = ("temporal_intervals", from_dt, to_dt, granularity, time_buckets.tz_name)
+    data = await request_flight.run(key, get_hour_interval_stats, get_collection(), time_buckets, match)
+    return {"data": data}
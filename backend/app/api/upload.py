@@ -43,13 +43,11 @@ async def upload_file(file: UploadFile = File(...), current_user: dict = Depends
 
     try:
         task_id = str(uuid.uuid4())
-        upload_dir = Path("upload")
+        upload_dir = Path(settings.UPLOAD_DIR)
         upload_dir.mkdir(parents=True, exist_ok=True)
         save_path = upload_dir / file.filename
 
-        # file_size = await save_large_upload(file, save_path)
-        with open(save_path, "wb") as outfile:
-            outfile.write(await file.read())
+        await save_large_upload(file, save_path)
         logger.info(f"Received ZIP: {file.filename}")
 
         create_task(task_id, current_user.get('username'))
@@ -80,6 +78,10 @@ def check_task_status(task_id: str, current_user: dict = Depends(verify_token)):
     return {
         "task_id": task_id,
         "status": task.get("status"),
+        "progress": task.get("progress"),
+        "timeline": task.get("timeline"),
+        "elapsedSecs": task.get("elapsedSecs"),
+        "error": task.get("error"),
         "requested_by": current_user.get('username'),
         "task_owner": task.get("user"),
         "is_owner": current_user.get('username') == task.get("user"),
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,6 +20,52 @@ class Settings:
     # Upload directory
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
 
+    # Size of the blocks read from each archive member during ingestion
+    ZIP_READ_CHUNK_SIZE: int = int(os.getenv("ZIP_READ_CHUNK_SIZE", 4 * 1024 * 1024))
+    # Worker processes used to parse archive members in parallel
+    PARSE_WORKERS: int = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+    # Archives smaller than this (uncompressed) are parsed in-process
+    PARALLEL_PARSE_MIN_BYTES: int = int(os.getenv("PARALLEL_PARSE_MIN_BYTES", 64 * 1024 * 1024))
+    # Where parse workers spill parsed events before they are merged (system temp dir if unset)
+    INGEST_SPILL_DIR: Optional[str] = os.getenv("INGEST_SPILL_DIR") or None
+    # Requests/responses waiting for their counterpart, and how long (log time) they may wait
+    CORRELATION_MAX_PENDING: int = int(os.getenv("CORRELATION_MAX_PENDING", 1_000_000))
+    CORRELATION_TIMEOUT_SECS: float = float(os.getenv("CORRELATION_TIMEOUT_SECS", 3600))
+    # Paired transactions per batch handed from the correlator to serialisation, storage and the summary
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", 5000))
+    # Token ids per $in query when probing for duplicate tokens
+    TOKEN_PROBE_BATCH_SIZE: int = int(os.getenv("TOKEN_PROBE_BATCH_SIZE", 5000))
+    # Persisted Bloom filter of every tokenId stored, used to skip lookups for new tokens
+    TOKEN_FILTER_PATH: str = os.getenv("TOKEN_FILTER_PATH", os.path.join(UPLOAD_DIR, "token_filter.bin"))
+    TOKEN_FILTER_CAPACITY: int = int(os.getenv("TOKEN_FILTER_CAPACITY", 10_000_000))
+    TOKEN_FILTER_ERROR_RATE: float = float(os.getenv("TOKEN_FILTER_ERROR_RATE", 0.001))
+    # Documents/operations per bulk write chunk, and how many chunks may be queued at once
+    BULK_WRITE_CHUNK_SIZE: int = int(os.getenv("BULK_WRITE_CHUNK_SIZE", 5000))
+    BULK_WRITE_MAX_PENDING_CHUNKS: int = int(os.getenv("BULK_WRITE_MAX_PENDING_CHUNKS", 6))
+    # Amount histogram buckets: "log" (START * BASE**i), "linear" (START..STOP) or "custom" (comma separated edges)
+    AMOUNT_BUCKET_SCALE: str = os.getenv("AMOUNT_BUCKET_SCALE", "log")
+    AMOUNT_BUCKET_COUNT: int = int(os.getenv("AMOUNT_BUCKET_COUNT", 10))
+    AMOUNT_BUCKET_START: float = float(os.getenv("AMOUNT_BUCKET_START", 1))
+    AMOUNT_BUCKET_BASE: float = float(os.getenv("AMOUNT_BUCKET_BASE", 10))
+    AMOUNT_BUCKET_STOP: float = float(os.getenv("AMOUNT_BUCKET_STOP", 10 ** 10))
+    AMOUNT_BUCKET_EDGES: List[float] = [float(edge) for edge in os.getenv("AMOUNT_BUCKET_EDGES", "").split(",") if edge.strip()]
+    # Calendar buckets of the daily summary's interval stats: minute, 5min, hour or day, aligned in SUMMARY_TIMEZONE
+    SUMMARY_INTERVAL_GRANULARITY: str = os.getenv("SUMMARY_INTERVAL_GRANULARITY", "hour")
+    SUMMARY_TIMEZONE: str = os.getenv("SUMMARY_TIMEZONE", "UTC")
+    # Most buckets /temporal/intervals may return; longer ranges need a coarser granularity
+    TEMPORAL_MAX_BUCKETS: int = int(os.getenv("TEMPORAL_MAX_BUCKETS", 10000))
+    # Relative accuracy of the processing time quantile sketches stored with each daily summary
+    LATENCY_SKETCH_ACCURACY: float = float(os.getenv("LATENCY_SKETCH_ACCURACY", 0.01))
+    # Lists kept by rollups and range summaries: error documents per error code, duplicate
+    # tokens (the most duplicated first) and occurrences per duplicate token
+    RANGE_ERROR_DOCS_PER_CODE: int = int(os.getenv("RANGE_ERROR_DOCS_PER_CODE", 20))
+    RANGE_DUPLICATE_TOKENS: int = int(os.getenv("RANGE_DUPLICATE_TOKENS", 200))
+    RANGE_TOKEN_OCCURRENCES: int = int(os.getenv("RANGE_TOKEN_OCCURRENCES", 20))
+    # Range summary cache: "memory" (per worker), "mongo" (shared by all workers) or "none"
+    RANGE_CACHE_BACKEND: str = os.getenv("RANGE_CACHE_BACKEND", "memory").lower()
+    RANGE_CACHE_MAX_ENTRIES: int = int(os.getenv("RANGE_CACHE_MAX_ENTRIES", 256))
+    RANGE_CACHE_TTL_SECS: float = float(os.getenv("RANGE_CACHE_TTL_SECS", 300))
+
     #Filename
     FILENAME_REGEX: str = r"transactions_(\d{8})\.zip"
 
@@ -37,13 +83,30 @@ class Settings:
     MONGODB_TOKENS_COLLECTION_NAME: str = os.getenv("MONGODB_TOKENS_COLLECTION_NAME", "tokens")
     MONGODB_TEMP_TOKENS_COLLECTION_NAME: str = os.getenv("MONGODB_TEMP_TOKENS_COLLECTION_NAME", "tempTokens2")
     MONGODB_TEMP_COLLECTION_NAME: str = os.getenv("MONGODB_TEMP_COLLECTION_NAME","Temp2")
+    MONGODB_RANGE_CACHE_COLLECTION_NAME: str = os.getenv("MONGODB_RANGE_CACHE_COLLECTION_NAME", "Range_Summary_Cache")
+    # Copy each upload into the temp collection and build the daily summary from it,
+    # instead of accumulating the summary in-process during ingest
+    USE_TEMP_COLLECTION: bool = os.getenv("USE_TEMP_COLLECTION", "false").lower() in ("1", "true", "yes")
     MONGODB_REFRESH_TOKEN_NAME:str=os.getenv("MONGODB_REFRESH_TOKEN_NAME","Refresh_Token")
+    # Connection pool of the shared MongoDB client
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", 50))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", 10))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 30000))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 5000))
+    MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 20000))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 20000))
+    # Command/pool/server monitoring listeners; commands slower than the threshold are logged redacted
+    MONGODB_MONITORING: bool = os.getenv("MONGODB_MONITORING", "true").lower() in ("1", "true", "yes")
+    MONGODB_SLOW_COMMAND_MS: float = float(os.getenv("MONGODB_SLOW_COMMAND_MS", 500))
+    MONGODB_SLOW_COMMAND_LOG_CHARS: int = int(os.getenv("MONGODB_SLOW_COMMAND_LOG_CHARS", 2000))
 
     #JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY","VerySecret")
     ALGORITHM: str = os.getenv("ALGORITHM","")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES",60))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS",7))
+    # Bearer token a Prometheus scraper may use for /metrics instead of a user access token
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
 
     class Config:
         env_file = ".env"
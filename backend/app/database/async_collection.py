@@ -0,0 +1,95 @@
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, List, Optional
+from pymongo.collection import Collection
+from starlette.concurrency import run_in_threadpool
+
+# Documents fetched per trip to the threadpool while iterating a cursor
+CURSOR_BATCH_SIZE = 1000
+
+class AsyncCursor:
+    """
+    Async view of a pymongo cursor. The cursor is opened and read in the
+    threadpool, a batch at a time, so iterating never blocks the event loop.
+    Supports `async for` and to_list(), plus sort/skip/limit before iteration.
+    """
+
+    def __init__(self, open_cursor: Callable[[], Any]):
+        self._open_cursor = open_cursor
+        self._modifiers = []
+        self._cursor = None
+        self._buffer = deque()
+
+    def sort(self, *args, **kwargs) -> "AsyncCursor":
+        self._modifiers.append(("sort", args, kwargs))
+        return self
+
+    def skip(self, count: int) -> "AsyncCursor":
+        self._modifiers.append(("skip", (count,), {}))
+        return self
+
+    def limit(self, count: int) -> "AsyncCursor":
+        self._modifiers.append(("limit", (count,), {}))
+        return self
+
+    def _open(self):
+        cursor = self._open_cursor()
+        for name, args, kwargs in self._modifiers:
+            cursor = getattr(cursor, name)(*args, **kwargs)
+        return cursor
+
+    def _next_batch(self, size: int) -> List[dict]:
+        if self._cursor is None:
+            self._cursor = self._open()
+        return list(islice(self._cursor, size))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if not self._buffer:
+            self._buffer = deque(await run_in_threadpool(self._next_batch, CURSOR_BATCH_SIZE))
+            if not self._buffer:
+                raise StopAsyncIteration
+        return self._buffer.popleft()
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        """Remaining documents, at most `length` of them."""
+        documents = []
+        async for document in self:
+            documents.append(document)
+            if length is not None and len(documents) >= length:
+                break
+        return documents
+
+class AsyncCollection:
+    """
+    Awaitable reads on a pymongo collection for `async def` routes. Each call
+    runs the blocking driver call in the threadpool, so a slow query only
+    occupies a worker thread while other requests keep being served.
+    """
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    @property
+    def name(self) -> str:
+        return self.collection.name
+
+    def find(self, *args, **kwargs) -> AsyncCursor:
+        return AsyncCursor(lambda: self.collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline: List[dict], **kwargs) -> AsyncCursor:
+        return AsyncCursor(lambda: self.collection.aggregate(pipeline, **kwargs))
+
+    async def find_one(self, *args, **kwargs) -> Optional[dict]:
+        return await run_in_threadpool(self.collection.find_one, *args, **kwargs)
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        return await run_in_threadpool(self.collection.count_documents, filter, **kwargs)
+
+    async def estimated_document_count(self, **kwargs) -> int:
+        return await run_in_threadpool(self.collection.estimated_document_count, **kwargs)
+
+    async def distinct(self, key: str, *args, **kwargs) -> list:
+        return await run_in_threadpool(self.collection.distinct, key, *args, **kwargs)
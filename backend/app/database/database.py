@@ -1,6 +1,7 @@
 from pymongo import MongoClient
 from pymongo.errors import ServerSelectionTimeoutError
 from app.core.config import settings
+from app.repositories.mongo import close_client, get_client, get_database
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +16,7 @@ class MongoDB:
     daily_summary = None
     overall_summary = None
     refresh_token_coll = None  # NEW
+    login_coll = None
 
 mongodb = MongoDB()
 
@@ -22,24 +24,11 @@ async def connect_to_mongo():
     try:
         logger.info("Connecting to MongoDB")
 
-        if not settings.MONGODB_URL:
-            raise ValueError("MONGODB_URL is not set in environment variables")
-        if not settings.MONGODB_DB_NAME:
-            raise ValueError("MONGODB_DB_NAME is not set in environment variables")
-
-        client = MongoClient(
-                    settings.MONGODB_URL,
-                    maxPoolSize=50,
-                    minPoolSize=10,
-                    maxIdleTimeMS=30000,
-                    waitQueueTimeoutMS=5000,
-                    connectTimeoutMS=20000,
-                    serverSelectionTimeoutMS=20000
-                )
+        client = get_client()
         client.admin.command('ping')
         logger.info("MongoDB connection established successfully")
 
-        database = client[settings.MONGODB_DB_NAME]
+        database = get_database()
         mongodb.client = client
         mongodb.database = database
 
@@ -48,12 +37,14 @@ async def connect_to_mongo():
         temptoken_coll = database[settings.MONGODB_TEMP_TOKENS_COLLECTION_NAME]
         daily_collection = database[settings.MONGODB_DAILY_SUMM_COLLECTION_NAME]
         overall_collection = database[settings.MONGODB_SUMM_COLLECTION_NAME]
+        login_coll = database[settings.MONGODB_LOGIN]
 
         mongodb.token_coll = token_coll
         mongodb.temp_coll = temp_coll
         mongodb.temptoken_coll = temptoken_coll
         mongodb.daily_summary = daily_collection
         mongodb.overall_summary = overall_collection
+        mongodb.login_coll = login_coll
 
         initialize_collections()
 
@@ -72,7 +63,8 @@ async def connect_to_mongo():
 
 async def close_mongo_connection():
     if mongodb.client is not None:
-        mongodb.client.close()
+        close_client()
+        mongodb.client = None
         logger.info("Disconnected from MongoDB")
 
 def initialize_collections():
@@ -127,6 +119,12 @@ def get_refresh_token_collection():
         raise RuntimeError("Database connection not established")
     return mongodb.refresh_token_coll
 
+def get_login_collection():
+    if mongodb.login_coll is None:
+        logger.error("MongoDB login collection not initialized")
+        raise RuntimeError("Database connection not established")
+    return mongodb.login_coll
+
 def get_collection():
     if mongodb.collection is None:
         logger.error("MongoDB collection not initialized")
@@ -1,5 +1,7 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 from app.api.auth import router as auth_router
 from app.api.upload import router as upload_router
@@ -11,8 +13,14 @@ from app.api.search import router as search_router
 from app.api.duplicates import router as duplicate_router
 from app.api.custom_query import router as custom_router
 from dotenv import load_dotenv
-from app.database.database import get_collection
+from app.database.database import get_collection, get_daily_collection, get_overall_collection
+from app.database.async_collection import AsyncCollection
 from app.middleware.auth import JWTMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.utils.metrics import registry
+from app.utils.token_filter import load_token_filter
+from app.utils.mongo_monitoring import label_route_operation, mongo_operation, monitor
+from app.services.rollups import ensure_rollups
 import logging
 load_dotenv()
 
@@ -23,6 +31,9 @@ logging.basicConfig(level=logging.INFO)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    with mongo_operation("startup"):
+        load_token_filter()
+        ensure_rollups(get_daily_collection(), get_overall_collection())
     logger.info("Application startup complete")
     yield
     await close_mongo_connection()
@@ -30,7 +41,9 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Labels each request's MongoDB commands with its route
+    dependencies=[Depends(label_route_operation)]
 )
 
 app.add_middleware(
@@ -43,6 +56,8 @@ app.add_middleware(
 )
 
 app.add_middleware(JWTMiddleware)
+# Outermost, so rejected and failed requests are timed too
+app.add_middleware(MetricsMiddleware)
 app.include_router(auth_router)
 app.include_router(upload_router)
 app.include_router(analytics_router)
@@ -64,7 +79,7 @@ async def read_sample():
         logger.info("Getting collection")
         collection = get_collection()
         logger.info("Calling find_one()")
-        doc = collection.find_one()
+        doc = await AsyncCollection(collection).find_one()
         logger.info(f"Raw document: {doc}")
         
         if doc:
@@ -78,7 +93,17 @@ async def read_sample():
 async def mongo_health_check():
     try:
         from app.utils.log_storage import LogStorageService
-        count = await LogStorageService.get_logs_count()
+        count = await run_in_threadpool(LogStorageService.get_logs_count)
         return {"status": "ok", "total_logs": count}
     except Exception as e:
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
+
+@app.get("/mongo-stats")
+async def mongo_stats():
+    """Latency of MongoDB commands by collection, command and route/ingest stage, plus pool and server state"""
+    return monitor.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Process metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
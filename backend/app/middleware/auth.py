@@ -1,8 +1,10 @@
+import hmac
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from jose import JWTError, jwt
 from app.api.auth_jwt import SECRET_KEY, ALGORITHM
+from app.core.config import settings
 
 class JWTMiddleware(BaseHTTPMiddleware):
     """
@@ -27,6 +29,9 @@ class JWTMiddleware(BaseHTTPMiddleware):
             return JSONResponse({"detail": "Not authenticated"}, status_code=401)
 
         token = auth_header.split(" ")[1]
+        # Scrapers authenticate with the static metrics token; users still can with their access token
+        if request.url.path == "/metrics" and settings.METRICS_TOKEN and hmac.compare_digest(token, settings.METRICS_TOKEN):
+            return await call_next(request)
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
             if payload.get("type") != "access":
@@ -0,0 +1,43 @@
+import time
+from app.utils.metrics import registry
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "API request latency", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge("http_requests_in_progress", "API requests being served")
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request into http_request_duration_seconds, labelled with
+    the matched route template (not the raw path, which would carry ids) and
+    the response status.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.inc(-1)
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"]
+            )
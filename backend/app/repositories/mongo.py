@@ -0,0 +1,51 @@
+import logging
+import threading
+from typing import Optional
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.database import Database
+from app.core.config import settings
+from app.utils.mongo_monitoring import monitoring_listeners
+
+logger = logging.getLogger(__name__)
+
+# The one MongoClient of the process. Every module goes through get_client(),
+# so there is a single connection pool, sized from settings.
+_client: Optional[MongoClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> MongoClient:
+    """The shared client, created on first use (normally by connect_to_mongo in the lifespan hook)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if not settings.MONGODB_URL:
+                    raise ValueError("MONGODB_URL is not set in environment variables")
+                _client = MongoClient(
+                    settings.MONGODB_URL,
+                    maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                    minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                    maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                    connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+                    serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                    event_listeners=monitoring_listeners()
+                )
+                logger.info(f"MongoDB client created (pool {settings.MONGODB_MIN_POOL_SIZE}-{settings.MONGODB_MAX_POOL_SIZE})")
+    return _client
+
+def get_database() -> Database:
+    if not settings.MONGODB_DB_NAME:
+        raise ValueError("MONGODB_DB_NAME is not set in environment variables")
+    return get_client()[settings.MONGODB_DB_NAME]
+
+def get_collection(name: str) -> Collection:
+    return get_database()[name]
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
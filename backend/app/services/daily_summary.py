@@ -0,0 +1,447 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+import math
+import bson
+import numpy as np
+from app.helper.convertType import parse_json
+from app.core.config import settings
+from app.utils.bucketing import BucketEdges, amount_bucket_edges
+from app.utils.time_bucketing import TimeBuckets
+from app.utils.sketches import MomentSummary, QuantileSketch
+
+# Fields the daily summary reads from every transaction. Only documents that go
+# into errorDocs are needed in full.
+SUMMARY_FIELDS = [
+    "Type_Of_Transaction", "Operation", "ErrorCode", "Result_of_Transaction", "input_amount",
+    "Time_to_Transaction_secs", "NumberOfInputs", "NumberOfOutputs", "Request_timestamp",
+    "SenderOrgId", "ReceiverOrgId", "Req_Tot_Amount"
+]
+
+def summary_pipeline():
+    """
+    Single-scan pipeline feeding DailySummaryAccumulator: error documents are
+    returned whole (they are copied into errorDocs), everything else is cut
+    down to SUMMARY_FIELDS on the server.
+    """
+    return [{
+        "$replaceRoot": {
+            "newRoot": {
+                "$cond": [
+                    {"$ne": ["$ErrorCode", "Success"]},
+                    "$$ROOT",
+                    {field: f"${field}" for field in SUMMARY_FIELDS}
+                ]
+            }
+        }
+    }]
+
+def bson_datetime(value: datetime) -> datetime:
+    """The value a datetime reads back as from MongoDB: naive UTC, truncated to milliseconds."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+def summary_view(doc: dict) -> dict:
+    """
+    What summary_pipeline() would return for `doc` once stored, without the
+    round trip: error documents whole and BSON-normalised, everything else
+    projected to SUMMARY_FIELDS.
+    """
+    if doc.get("ErrorCode") != "Success":
+        return bson.decode(bson.encode(doc))
+    view = {field: doc[field] for field in SUMMARY_FIELDS if field in doc}
+    request_time = view.get("Request_timestamp")
+    if isinstance(request_time, datetime):
+        view["Request_timestamp"] = bson_datetime(request_time)
+    return view
+
+_MISSING = object()
+
+# Groupings that get their own processing time sketch, besides the overall one
+LATENCY_GROUPS = ("byInputs", "byOutputs", "byType", "byOperation")
+
+def latency_percentiles(overall: QuantileSketch, groups: dict, round_to=None) -> dict:
+    """p50/p90/p99/p999 of the overall sketch and of every grouped sketch."""
+    def percentiles(sketch):
+        values = sketch.percentiles()
+        if round_to is not None:
+            values = {name: None if v is None else round_to(v) for name, v in values.items()}
+        return values
+
+    return {
+        "overall": percentiles(overall),
+        **{group: {key: percentiles(sketch) for key, sketch in sketches.items()} for group, sketches in groups.items()}
+    }
+
+def new_interval_stats() -> dict:
+    return {
+        "byCount": {"ONUS": 0, "OFFUS": 0, "TOTAL": 0},
+        "byAmount": {"ONUS": 0, "OFFUS": 0, "TOTAL": 0},
+        "byType": {"LOAD": 0, "TRANSFER": 0, "REDEEM": 0},
+        "byOp": {"MERGE": 0, "ISSUE": 0, "SPLIT": 0},
+    }
+
+def add_interval_stats(stats: dict, onus: bool, amount, typ: str, op: str, count: int = 1):
+    """Add `count` transactions of one kind, totalling `amount`, to an interval's stats."""
+    side = "ONUS" if onus else "OFFUS"
+    stats["byCount"][side] += count
+    stats["byAmount"][side] += amount
+    stats["byCount"]["TOTAL"] += count
+    stats["byAmount"]["TOTAL"] += amount
+    if typ in stats["byType"]:
+        stats["byType"][typ] += count
+    if op in stats["byOp"]:
+        stats["byOp"][op] += count
+
+def interval_stats_list(intervals: dict, time_buckets: TimeBuckets) -> list:
+    """transactionStatsByhourInterval entries from stats keyed by bucket start, in time order."""
+    return [{
+        "interval_start": time_buckets.isoformat(start),
+        "interval_end": time_buckets.isoformat(time_buckets.end(start)),
+        **intervals[start]
+    } for start in sorted(intervals)]
+
+class ExactSum:
+    """Running float sum without intermediate rounding (Shewchuk partials, as math.fsum)."""
+
+    __slots__ = ("partials",)
+
+    def __init__(self):
+        self.partials = []
+
+    def add(self, x: float):
+        i = 0
+        partials = self.partials
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    def value(self) -> float:
+        return math.fsum(self.partials)
+
+def _result_key(value):
+    if isinstance(value, str):
+        return value.upper()
+    elif isinstance(value, (int, float)):
+        return "SUCCESS" if float(value) == 1 else "FAILURE"
+    return "UNKNOWN"
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def r2(val):
+    return round(float(val), 2)
+
+def _compute_stats(moments: MomentSummary, prefix):
+    if not moments.count:
+        return {f"average{prefix}": 0, f"min{prefix}": 0, f"max{prefix}": 0}
+    return {
+        f"average{prefix}": r2(moments.mean),
+        f"min{prefix}": r2(moments.min),
+        f"max{prefix}": r2(moments.max),
+    }
+
+class DailySummaryAccumulator:
+    """
+    Builds the daily summary document from one pass over the day's transactions.
+
+    Every section of the summary keeps exactly the semantics of the per-section
+    queries it replaces in analytics_service (missing vs null fields, group
+    order). The interval stats are calendar-aligned (see TimeBuckets), so they
+    are also accumulated as the documents arrive. Statistics over all of the
+    day's transactions are kept as moment summaries and sketches, so the
+    accumulator's size depends on the number of distinct keys, not on the
+    number of transactions.
+    """
+
+    def __init__(self, amount_edges: BucketEdges = None, time_buckets: TimeBuckets = None):
+        self.type_counts = Counter()
+        self.operation_counts = Counter()
+        self.error_counts = Counter()
+        self.error_docs = {}
+        self.result_counts = Counter()
+
+        self.amount_edges = amount_edges or amount_bucket_edges()
+        self.buckets = [{
+            "label": label, "total": 0,
+            "LOAD": 0, "TRANSFER": 0, "REDEEM": 0, "SPLIT": 0, "MERGE": 0, "ISSUE": 0
+        } for label in self.amount_edges.labels]
+        self.total_transactions = 0
+        self.total_success = 0
+        self.total_processing_time = 0
+
+        self.cross = {name: {} for name in ("type_op", "op_type", "type_error", "op_error")}
+        self.time_by_inputs = {}
+        self.time_by_outputs = {}
+
+        self.time_buckets = time_buckets or TimeBuckets(settings.SUMMARY_INTERVAL_GRANULARITY, settings.SUMMARY_TIMEZONE)
+        self.intervals = {}
+
+        # Transaction statistics; moments keep them in constant memory however many transactions there are
+        self.processing_times = MomentSummary()
+        self.transaction_amounts = MomentSummary()
+        self.onus_amounts = MomentSummary()
+        self.offus_amounts = MomentSummary()
+
+        # Performance bubble accumulators: processing time moments per input/output count,
+        # and moments of the processing times and counts of every transaction in a bubble
+        self.inputs_bubble = {}
+        self.outputs_bubble = {}
+        self.bubble_times = MomentSummary()
+        self.bubble_inputs = MomentSummary()
+        self.bubble_outputs = MomentSummary()
+        # Processing time quantile sketches, overall and per group
+        self.latency = QuantileSketch(settings.LATENCY_SKETCH_ACCURACY)
+        self.latency_groups = {group: {} for group in LATENCY_GROUPS}
+
+        self.min_time = None
+        self.max_time = None
+
+    def add(self, doc: dict):
+        self.add_batch([doc])
+
+    def add_batch(self, docs: list):
+        """Add a batch of transactions, e.g. one chunk of an upload once it is stored."""
+        for doc in docs:
+            self._add(doc)
+        self._add_amount_buckets(docs)
+
+    def _add(self, doc: dict):
+        get = doc.get
+        typ = get("Type_Of_Transaction")
+        op = get("Operation")
+        error = get("ErrorCode")
+        self.type_counts[typ] += 1
+        self.operation_counts[op] += 1
+        self.error_counts[error] += 1
+        if error != "Success":
+            self.error_docs.setdefault(error, []).append(doc)
+        self.result_counts[_result_key(get("Result_of_Transaction"))] += 1
+
+        self._add_totals(doc)
+
+        raw_type = get("Type_Of_Transaction", _MISSING)
+        raw_op = get("Operation", _MISSING)
+        raw_error = get("ErrorCode", _MISSING)
+        cross = self.cross
+        for name, key in (("type_op", (raw_type, raw_op)), ("op_type", (raw_op, raw_type)),
+                          ("type_error", (raw_type, raw_error)), ("op_error", (raw_op, raw_error))):
+            cross[name][key] = cross[name].get(key, 0) + 1
+
+        processing_time = get("Time_to_Transaction_secs")
+        for table, x in ((self.time_by_inputs, get("NumberOfInputs")), (self.time_by_outputs, get("NumberOfOutputs"))):
+            entry = table.get(x)
+            if entry is None:
+                entry = table[x] = [ExactSum(), 0]
+            if _is_number(processing_time):
+                entry[0].add(processing_time)
+                entry[1] += 1
+
+        self._add_hour(doc)
+        self._add_transaction_stats(processing_time, get("Req_Tot_Amount"), get("SenderOrgId"), get("ReceiverOrgId"))
+
+        num_inputs = get("NumberOfInputs")
+        num_outputs = get("NumberOfOutputs")
+        if processing_time is not None and num_inputs is not None and num_outputs is not None:
+            for table, x in ((self.inputs_bubble, num_inputs), (self.outputs_bubble, num_outputs)):
+                moments = table.get(x)
+                if moments is None:
+                    moments = table[x] = MomentSummary()
+                moments.add(processing_time)
+            self.bubble_times.add(processing_time)
+            self.bubble_inputs.add(num_inputs)
+            self.bubble_outputs.add(num_outputs)
+            self._add_latency(processing_time, (num_inputs, num_outputs, typ, op))
+
+        request_time = get("Request_timestamp")
+        if request_time is not None:
+            if self.min_time is None or request_time < self.min_time:
+                self.min_time = request_time
+            if self.max_time is None or request_time > self.max_time:
+                self.max_time = request_time
+
+    def _add_totals(self, doc: dict):
+        self.total_transactions += 1
+        if _result_key(doc.get("Result_of_Transaction")) == "SUCCESS":
+            self.total_success += 1
+        self.total_processing_time += doc.get("Time_to_Transaction_secs", 0)
+
+    def _add_amount_buckets(self, docs: list):
+        # The batch's amount column is bucketed in one go; amounts that are not numbers fall in no bucket
+        amounts = np.fromiter(
+            (amount if _is_number(amount) else np.nan for amount in (doc.get("input_amount", 0) for doc in docs)),
+            dtype=np.float64, count=len(docs))
+        for doc, index in zip(docs, self.amount_edges.indices(amounts).tolist()):
+            if index < 0:
+                continue
+            bucket = self.buckets[index]
+            bucket["total"] += 1
+            typ = doc.get("Type_Of_Transaction", "UNKNOWN")
+            op = doc.get("Operation", "UNKNOWN")
+            if typ in bucket:
+                bucket[typ] += 1
+            if op in bucket:
+                bucket[op] += 1
+
+    def _add_hour(self, doc: dict):
+        ts = doc["Request_timestamp"]
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        onus = doc["ReceiverOrgId"] == doc["SenderOrgId"]
+        amount = doc["input_amount"]
+        typ = doc.get("Type_Of_Transaction", "UNKNOWN").upper()
+        op = doc.get("Operation", "UNKNOWN").upper()
+
+        start = self.time_buckets.floor(ts)
+        stats = self.intervals.get(start)
+        if stats is None:
+            stats = self.intervals[start] = new_interval_stats()
+        add_interval_stats(stats, onus, amount, typ, op)
+
+    def _add_latency(self, processing_time, group_values):
+        self.latency.add(processing_time)
+        for group, value in zip(LATENCY_GROUPS, group_values):
+            # Sketches are stored in BSON, so group keys must be strings
+            key = "UNKNOWN" if value is None else str(value)
+            sketch = self.latency_groups[group].get(key)
+            if sketch is None:
+                sketch = self.latency_groups[group][key] = QuantileSketch(self.latency.relative_accuracy)
+            sketch.add(processing_time)
+
+    def _latency_sketches(self):
+        return {
+            "overall": self.latency.to_dict(),
+            **{group: {key: sketch.to_dict() for key, sketch in sketches.items()}
+               for group, sketches in self.latency_groups.items()}
+        }
+
+    def _add_transaction_stats(self, processing_time, amount, sender, receiver):
+        if processing_time is not None:
+            self.processing_times.add(processing_time)
+        if amount is not None:
+            self.transaction_amounts.add(amount)
+            if sender is not None and receiver is not None:
+                if sender == receiver:
+                    self.onus_amounts.add(amount)
+                else:
+                    self.offus_amounts.add(amount)
+
+    def _cross(self, name: str, default_first="UNKNOWN", default_second="UNKNOWN"):
+        cross = defaultdict(dict)
+        for (first, second), count in self.cross[name].items():
+            first = default_first if first is _MISSING else first
+            second = default_second if second is _MISSING else second
+            cross[first][second] = count
+        return cross
+
+    def _time_by(self, table: dict):
+        # $group has no defined output order; sort by x (nulls first, as MongoDB sorts)
+        rows = sorted(table.items(), key=lambda item: (item[0] is not None, item[0] if item[0] is not None else 0))
+        return [{"x": x, "y": total.value() / count if count else None} for x, (total, count) in rows]
+
+    def _interval_stats(self):
+        return interval_stats_list(self.intervals, self.time_buckets)
+
+    def _transaction_stats(self):
+        stats = {}
+        for values, prefix in ((self.processing_times, "ProcessingTime"), (self.transaction_amounts, "TransactionAmount"),
+                               (self.onus_amounts, "ONUSTransactionAmount"), (self.offus_amounts, "OFFUSTransactionAmount")):
+            stats.update(_compute_stats(values, prefix))
+        stats["ONUSTotalAmount"] = r2(self.onus_amounts.total)
+        stats["OFFUSTotalAmount"] = r2(self.offus_amounts.total)
+        return stats
+
+    def _performance_stats(self):
+        def bubbles(table):
+            return [{
+                'x': x,
+                'y': moments.mean,
+                'size': moments.count,
+                'frequency': moments.count,
+                'avgProcessingTime': moments.mean,
+                'minProcessingTime': moments.min,
+                'maxProcessingTime': moments.max,
+            } for x, moments in table.items()]
+
+        stats = {
+            'avgProcessingTime': self.bubble_times.mean,
+            'maxProcessingTime': self.bubble_times.max,
+            'minProcessingTime': self.bubble_times.min,
+            'avgInputs': self.bubble_inputs.mean,
+            'maxInputs': self.bubble_inputs.max,
+            'avgOutputs': self.bubble_outputs.mean,
+            'maxOutputs': self.bubble_outputs.max,
+            'totalUniqueInputCounts': len(self.inputs_bubble),
+            'totalUniqueOutputCounts': len(self.outputs_bubble),
+            'mostFrequentInputCount': max(self.inputs_bubble.items(), key=lambda x: x[1].count)[0],
+            'mostFrequentOutputCount': max(self.outputs_bubble.items(), key=lambda x: x[1].count)[0]
+        }
+        return {
+            "inputsBubble": bubbles(self.inputs_bubble),
+            "outputsBubble": bubbles(self.outputs_bubble),
+            "performanceStatistics": stats
+        }
+
+    def build(self, duplicate_tokens: list) -> dict:
+        """Assemble the Daily_Transaction_Summary document; None if no transactions were added."""
+        if self.min_time is None:
+            return None
+
+        success_rate = self.total_success / self.total_transactions if self.total_transactions else 0
+        avg_processing_time = self.total_processing_time / self.total_transactions if self.total_transactions else 0
+        bucket_docs = [{
+            "interval": b["label"],
+            "total": b["total"],
+            "load": b["LOAD"],
+            "transfer": b["TRANSFER"],
+            "redeem": b["REDEEM"],
+            "split": b["SPLIT"],
+            "merge": b["MERGE"],
+            "issue": b["ISSUE"]
+        } for b in self.buckets]
+        processing_time_stats = parse_json(self._performance_stats())
+
+        start_time_iso = self.min_time.isoformat()
+        end_time_iso = self.max_time.isoformat()
+        return {
+            "date": start_time_iso[:10],
+            "start_time": start_time_iso,
+            "end_time": end_time_iso,
+            # Kept beside the summary so range queries can merge them; not sent with the day's summary
+            "latencySketches": self._latency_sketches(),
+            "bubbleMoments": {
+                "inputs": [{"x": x, **moments.to_dict()} for x, moments in self.inputs_bubble.items()],
+                "outputs": [{"x": x, **moments.to_dict()} for x, moments in self.outputs_bubble.items()]
+            },
+            "summary": {
+                "type": {k: v for k, v in self.type_counts.items() if k},
+                "operation": {k: v for k, v in self.operation_counts.items() if k},
+                "error": {k: v for k, v in self.error_counts.items() if k},
+                "errorDocs": self.error_docs,
+                "result": dict(self.result_counts),
+                # The original $sum adds the literal "input_amount" (no "$"), which is always 0
+                "sumAmount": 0,
+                "mergedTransactionAmountIntervals": bucket_docs,
+                "total": self.total_transactions,
+                "successRate": success_rate * 100,
+                "averageProcessingTime": avg_processing_time,
+                "crossTypeOp": self._cross("type_op"),
+                "crossOpType": self._cross("op_type"),
+                "crossTypeError": self._cross("type_error"),
+                "crossOpError": self._cross("op_error"),
+                "processingTimeByInputs": self._time_by(self.time_by_inputs),
+                "processingTimeByOutputs": self._time_by(self.time_by_outputs),
+                "transactionStatsByhourInterval": self._interval_stats(),
+                "latencyPercentiles": latency_percentiles(self.latency, self.latency_groups),
+                "duplicateTokens": duplicate_tokens,
+                **self._transaction_stats(),
+                **processing_time_stats
+            }
+        }
@@ -0,0 +1,469 @@
+from collections import defaultdict
+from app.core.config import settings
+from app.services.daily_summary import LATENCY_GROUPS, latency_percentiles, r2
+from app.utils.sketches import MomentSummary, QuantileSketch, merge_sketch_groups
+
+# Daily summary sections a range summary reads; the per-transaction hour
+# stats, percentiles and per-day performance blocks are never fetched.
+# ReceiverOrgId/SenderOrgId are read at the top level by the temporal section.
+RANGE_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "date": 1,
+    "ReceiverOrgId": 1,
+    "SenderOrgId": 1,
+    "bubbleMoments": 1,
+    "latencySketches": 1,
+    **{f"summary.{field}": 1 for field in (
+        "total", "result", "averageProcessingTime", "type", "operation", "error", "errorDocs",
+        "mergedTransactionAmountIntervals", "crossTypeOp", "crossOpType", "crossTypeError", "crossOpError",
+        "duplicateTokens", "sum_amount", "inputsBubble", "outputsBubble",
+        "minProcessingTime", "maxProcessingTime", "minONUSTransactionAmount", "maxONUSTransactionAmount",
+        "minOFFUSTransactionAmount", "maxOFFUSTransactionAmount", "ONUSTotalAmount", "OFFUSTotalAmount"
+    )}
+}
+
+class TemporalAccumulator:
+    """Per-date counts and amounts of the range summary's "temporal" section."""
+
+    def __init__(self):
+        self.temporal_summary = defaultdict(lambda: {
+            "byCount": {"ONUS": 0, "OFFUS": 0, "TOTAL": 0},
+            "byAmount": {"ONUS": 0, "OFFUS": 0, "TOTAL": 0},
+            "byType": {"REDEEM": 0, "TRANSFER": 0, "LOAD": 0},
+            "byOp": {"SPLIT": 0, "MERGE": 0, "ISSUE": 0},
+        })
+
+    def add(self, doc: dict):
+        summary = doc.get("summary", {})
+        temporal = self.temporal_summary[doc["date"]]
+        count = summary.get("total", 0)
+        sum_amount = summary.get("sum_amount", 0.0)
+
+        temporal["byCount"]["TOTAL"] += count
+        temporal["byAmount"]["TOTAL"] += sum_amount
+        # Daily summaries carry no org ids, so every day is counted as ONUS
+        if doc.get("ReceiverOrgId") == doc.get("SenderOrgId"):
+            temporal["byCount"]["ONUS"] += count
+            temporal["byAmount"]["ONUS"] += sum_amount
+        else:
+            temporal["byCount"]["OFFUS"] += count
+            temporal["byAmount"]["OFFUS"] += sum_amount
+
+        for type_key, type_value in summary.get("type", {}).items():
+            temporal["byType"][type_key] += type_value
+        for op_key, op_value in summary.get("operation", {}).items():
+            temporal["byOp"][op_key] += op_value
+
+    def merge_state(self, rows: list):
+        for row in rows:
+            temporal = self.temporal_summary[row["date"]]
+            for section in ("byCount", "byAmount", "byType", "byOp"):
+                for key, value in row[section].items():
+                    temporal[section][key] = temporal[section].get(key, 0) + value
+
+    def build(self) -> list:
+        return [
+            {
+                "date": date,
+                "byCount": dict(temporal["byCount"]),
+                "byAmount": dict(temporal["byAmount"]),
+                "byType": dict(temporal["byType"]),
+                "byOp": dict(temporal["byOp"]),
+            }
+            for date, temporal in self.temporal_summary.items()
+        ]
+
+class TransactionStatsAccumulator:
+    """Range-wide processing time and ONUS/OFFUS amount statistics."""
+
+    def __init__(self):
+        self.stats = {
+            "averageProcessingTime": 0.0,
+            "minProcessingTime": float('inf'),
+            "maxProcessingTime": -float('inf'),
+            "minONUSTransactionAmount": float('inf'),
+            "maxONUSTransactionAmount": -float('inf'),
+            "minOFFUSTransactionAmount": float('inf'),
+            "maxOFFUSTransactionAmount": -float('inf'),
+            "ONUSTotalAmount": 0.0,
+            "OFFUSTotalAmount": 0.0
+        }
+        self.count_total = 0
+        self.processing_time = 0
+        self.onus_amt = 0
+        self.offus_amt = 0
+
+    def add(self, doc: dict):
+        summary = doc.get("summary", {})
+        count = summary.get("total", 0)
+        self.onus_amt += summary.get("ONUSTotalAmount", 0.0)
+        self.offus_amt += summary.get("OFFUSTotalAmount", 0.0)
+        self.count_total += count
+        self.processing_time += summary.get("averageProcessingTime", 0.0) * count
+
+        stats = self.stats
+        for field in ("minProcessingTime", "minONUSTransactionAmount", "minOFFUSTransactionAmount"):
+            stats[field] = min(stats[field], summary.get(field, 0.0))
+        for field in ("maxProcessingTime", "maxONUSTransactionAmount", "maxOFFUSTransactionAmount"):
+            stats[field] = max(stats[field], summary.get(field, 0.0))
+
+    def to_state(self) -> dict:
+        return {
+            "stats": dict(self.stats),
+            "countTotal": self.count_total,
+            "processingTime": self.processing_time,
+            "onusAmount": self.onus_amt,
+            "offusAmount": self.offus_amt
+        }
+
+    def merge_state(self, state: dict):
+        self.count_total += state["countTotal"]
+        self.processing_time += state["processingTime"]
+        self.onus_amt += state["onusAmount"]
+        self.offus_amt += state["offusAmount"]
+        for field, value in state["stats"].items():
+            if field.startswith("min"):
+                self.stats[field] = min(self.stats[field], value)
+            elif field.startswith("max"):
+                self.stats[field] = max(self.stats[field], value)
+
+    def build(self) -> dict:
+        stats = dict(self.stats)
+        if self.count_total > 0:
+            stats["averageProcessingTime"] = self.processing_time / self.count_total
+            stats["averageONUSTransactionAmount"] = self.onus_amt / self.count_total
+            stats["averageOFFUSTransactionAmount"] = self.offus_amt / self.count_total
+        stats["ONUSTotalAmount"] = self.onus_amt
+        stats["OFFUSTotalAmount"] = self.offus_amt
+        return stats
+
+class BubbleAccumulator:
+    """
+    inputsBubble, outputsBubble, performanceStatistics and latencyPercentiles
+    of a range, merged from per-day moment summaries and quantile sketches:
+    O(days x distinct counts) however many transactions the range holds.
+    """
+
+    def __init__(self):
+        self.inputs_agg = {}
+        self.outputs_agg = {}
+        self.latency = QuantileSketch(settings.LATENCY_SKETCH_ACCURACY)
+        self.latency_groups = {group: {} for group in LATENCY_GROUPS}
+
+    def add(self, doc: dict):
+        summary = doc.get('summary', {})
+        stored_moments = doc.get('bubbleMoments')
+        for side, bubble_key, agg in (('inputs', 'inputsBubble', self.inputs_agg), ('outputs', 'outputsBubble', self.outputs_agg)):
+            if stored_moments is not None:
+                items = [(item['x'], MomentSummary.from_dict(item)) for item in stored_moments.get(side, [])]
+            else:
+                # Summaries written before moments were stored only have the bubbles
+                items = [(item['x'], MomentSummary.from_bubble(item)) for item in summary.get(bubble_key, [])]
+            for x, moments in items:
+                if x in agg:
+                    agg[x].merge(moments)
+                else:
+                    agg[x] = moments
+
+        sketches = doc.get('latencySketches')
+        if sketches:
+            self.latency.merge(QuantileSketch.from_dict(sketches['overall']))
+            for group in LATENCY_GROUPS:
+                merge_sketch_groups(self.latency_groups[group], sketches.get(group, {}))
+
+    def to_state(self) -> dict:
+        """Same shape as the bubbleMoments/latencySketches of a daily summary, so add() merges it back."""
+        return {
+            "bubbleMoments": {
+                "inputs": [{"x": x, **moments.to_dict()} for x, moments in self.inputs_agg.items()],
+                "outputs": [{"x": x, **moments.to_dict()} for x, moments in self.outputs_agg.items()]
+            },
+            "latencySketches": {
+                "overall": self.latency.to_dict(),
+                **{group: {key: sketch.to_dict() for key, sketch in sketches.items()}
+                   for group, sketches in self.latency_groups.items()}
+            }
+        }
+
+    def build(self) -> dict:
+        inputs_agg, outputs_agg = self.inputs_agg, self.outputs_agg
+
+        def bubbles(agg):
+            return [{
+                'x': x,
+                'y': r2(moments.mean),
+                'size': moments.count,
+                'frequency': moments.count,
+                'avgProcessingTime': r2(moments.mean),
+                'minProcessingTime': r2(moments.min),
+                'maxProcessingTime': r2(moments.max)
+            } for x, moments in agg.items() if moments.count > 0]
+
+        def count_moments(agg):
+            # Moments of the input/output counts themselves, weighted by frequency
+            moments = MomentSummary()
+            for x, times in agg.items():
+                moments.add(x, times.count)
+            return moments
+
+        performance_stats = {}
+        processing_times = MomentSummary()
+        for moments in inputs_agg.values():
+            processing_times.merge(moments)
+        input_counts = count_moments(inputs_agg)
+        output_counts = count_moments(outputs_agg)
+
+        if processing_times.count:
+            performance_stats.update({
+                'avgProcessingTime': r2(processing_times.mean),
+                'maxProcessingTime': r2(processing_times.max),
+                'minProcessingTime': r2(processing_times.min)
+            })
+            if processing_times.std is not None:
+                performance_stats['stdProcessingTime'] = r2(processing_times.std)
+
+        if input_counts.count:
+            performance_stats.update({
+                'avgInputs': r2(input_counts.mean),
+                'maxInputs': int(input_counts.max)
+            })
+
+        if output_counts.count:
+            performance_stats.update({
+                'avgOutputs': r2(output_counts.mean),
+                'maxOutputs': int(output_counts.max)
+            })
+
+        performance_stats.update({
+            'totalUniqueInputCounts': len(inputs_agg),
+            'totalUniqueOutputCounts': len(outputs_agg)
+        })
+
+        if inputs_agg:
+            performance_stats['mostFrequentInputCount'] = max(inputs_agg.items(), key=lambda x: x[1].count)[0]
+
+        if outputs_agg:
+            performance_stats['mostFrequentOutputCount'] = max(outputs_agg.items(), key=lambda x: x[1].count)[0]
+
+        return {
+            'inputsBubble': bubbles(inputs_agg),
+            'outputsBubble': bubbles(outputs_agg),
+            'performanceStatistics': performance_stats,
+            'latencyPercentiles': latency_percentiles(self.latency, self.latency_groups, r2)
+        }
+
+def add_duplicate_tokens(merged_tokens: dict, tokens: list):
+    """Merge daily duplicateTokens entries into `merged_tokens`, keyed by tokenId."""
+    for token in tokens:
+        merged = merged_tokens.get(token["tokenId"])
+        if merged is None:
+            # Occurrences are copied so merging later days never modifies the daily documents
+            merged_tokens[token["tokenId"]] = {
+                "tokenId": token["tokenId"],
+                "firstSeen": token["firstSeen"],
+                "lastSeen": token["lastSeen"],
+                "count": token["count"],
+                "uniqueSenderOrgs": token["uniqueSenderOrgs"],
+                "uniqueReceiverOrgs": token["uniqueReceiverOrgs"],
+                "totalAmount": token["totalAmount"],
+                "occurrences": list(token["occurrences"])
+            }
+            continue
+
+        merged["count"] += token["count"]
+        merged["totalAmount"] += token["totalAmount"]
+        merged["occurrences"].extend(token["occurrences"])
+        occurrences = merged["occurrences"]
+        # Rollups keep only the latest occurrences, so the stored counts may exceed what is left to count
+        merged["uniqueSenderOrgs"] = max(merged["uniqueSenderOrgs"], token["uniqueSenderOrgs"],
+                                         len({o["senderOrg"] for o in occurrences if o.get("senderOrg")}))
+        merged["uniqueReceiverOrgs"] = max(merged["uniqueReceiverOrgs"], token["uniqueReceiverOrgs"],
+                                           len({o["receiverOrg"] for o in occurrences if o.get("receiverOrg")}))
+        merged["firstSeen"] = min(merged["firstSeen"], token["firstSeen"])
+        merged["lastSeen"] = max(merged["lastSeen"], token["lastSeen"])
+
+class RangeSummaryAccumulator:
+    """
+    Builds the summary of a date range from one pass over its daily summary
+    documents; every section, including temporal, transaction statistics and
+    bubbles, is fed from the same document as it is read.
+    """
+
+    def __init__(self):
+        self.days = 0
+        self.type_counts = defaultdict(int)
+        self.operation_counts = defaultdict(int)
+        self.error_counts = defaultdict(int)
+        # Error code -> its latest error documents, and whether any list was cut to its limit
+        self.error_docs = {}
+        self.lists_truncated = False
+        self.result_counts = defaultdict(int)
+        self.total_transactions = 0
+        self.total_success = 0
+        self.total_processing_time = 0
+        self.merged_transaction_amount_intervals = defaultdict(lambda: {
+            "total": 0,
+            "load": 0,
+            "transfer": 0,
+            "redeem": 0,
+            "split": 0,
+            "merge": 0,
+            "issue": 0
+        })
+        self.cross_type_op = defaultdict(lambda: defaultdict(int))
+        self.cross_op_type = defaultdict(lambda: defaultdict(int))
+        self.cross_type_error = defaultdict(lambda: defaultdict(int))
+        self.cross_op_error = defaultdict(lambda: defaultdict(int))
+        self.merged_tokens = {}
+
+        self.temporal = TemporalAccumulator()
+        self.transaction_stats = TransactionStatsAccumulator()
+        self.bubbles = BubbleAccumulator()
+
+    def add(self, doc: dict):
+        self.days += 1
+        summary = doc.get("summary", {})
+
+        self.total_transactions += summary.get("total", 0)
+        self.total_success += summary.get("result", {}).get("SUCCESS", 0)
+        self.total_processing_time += summary.get("total", 0) * summary.get("averageProcessingTime", 0)
+
+        for t, count in summary.get("type", {}).items():
+            self.type_counts[t] += count
+        for o, count in summary.get("operation", {}).items():
+            self.operation_counts[o] += count
+        for e, count in summary.get("error", {}).items():
+            self.error_counts[e] += count
+        self._add_error_docs(summary.get("errorDocs", {}))
+        for r, count in summary.get("result", {}).items():
+            self.result_counts[r] += count
+
+        for x in summary.get("mergedTransactionAmountIntervals", []):
+            interval = x.get("interval")
+            if interval:
+                merged = self.merged_transaction_amount_intervals[interval]
+                for key in ("total", "load", "transfer", "redeem", "split", "merge", "issue"):
+                    merged[key] += x.get(key, 0)
+
+        for section, cross in (("crossTypeOp", self.cross_type_op), ("crossOpType", self.cross_op_type),
+                               ("crossTypeError", self.cross_type_error), ("crossOpError", self.cross_op_error)):
+            for first, counts in summary.get(section, {}).items():
+                for second, count in counts.items():
+                    cross[first][second] += count
+
+        add_duplicate_tokens(self.merged_tokens, summary.get("duplicateTokens", []))
+
+        self.temporal.add(doc)
+        self.transaction_stats.add(doc)
+        self.bubbles.add(doc)
+
+    def _add_error_docs(self, error_docs: dict):
+        limit = settings.RANGE_ERROR_DOCS_PER_CODE
+        for code, docs in error_docs.items():
+            kept = self.error_docs.setdefault(code, [])
+            kept.extend(docs)
+            if len(kept) > limit:
+                del kept[:-limit]
+                self.lists_truncated = True
+
+    def _bounded_lists(self):
+        """errorDocs and duplicateTokens within the RANGE_* limits, and whether anything was cut."""
+        truncated = self.lists_truncated
+        tokens = list(self.merged_tokens.values())
+        if len(tokens) > settings.RANGE_DUPLICATE_TOKENS:
+            tokens = sorted(tokens, key=lambda token: token["count"], reverse=True)[:settings.RANGE_DUPLICATE_TOKENS]
+            truncated = True
+        limit = settings.RANGE_TOKEN_OCCURRENCES
+        bounded_tokens = []
+        for token in tokens:
+            if len(token["occurrences"]) > limit:
+                token = {**token, "occurrences": token["occurrences"][-limit:]}
+                truncated = True
+            bounded_tokens.append(token)
+        return self.error_docs, bounded_tokens, truncated
+
+    def to_state(self) -> dict:
+        """
+        Everything merged so far as a BSON document that merge_state() folds
+        into another accumulator; errorDocs and duplicateTokens are bounded.
+        """
+        error_docs, duplicate_tokens, lists_truncated = self._bounded_lists()
+        return {
+            "days": self.days,
+            "type": dict(self.type_counts),
+            "operation": dict(self.operation_counts),
+            "error": dict(self.error_counts),
+            "result": dict(self.result_counts),
+            "totalTransactions": self.total_transactions,
+            "totalSuccess": self.total_success,
+            "totalProcessingTime": self.total_processing_time,
+            "mergedTransactionAmountIntervals": [
+                {"interval": key, **value} for key, value in self.merged_transaction_amount_intervals.items()
+            ],
+            "crossTypeOp": self.cross_type_op,
+            "crossOpType": self.cross_op_type,
+            "crossTypeError": self.cross_type_error,
+            "crossOpError": self.cross_op_error,
+            "temporal": self.temporal.build(),
+            "transactionStats": self.transaction_stats.to_state(),
+            "errorDocs": error_docs,
+            "duplicateTokens": duplicate_tokens,
+            "listsTruncated": lists_truncated,
+            **self.bubbles.to_state()
+        }
+
+    def merge_state(self, state: dict):
+        self.days += state["days"]
+        for counts, key in ((self.type_counts, "type"), (self.operation_counts, "operation"),
+                            (self.error_counts, "error"), (self.result_counts, "result")):
+            for name, count in state[key].items():
+                counts[name] += count
+        self.total_transactions += state["totalTransactions"]
+        self.total_success += state["totalSuccess"]
+        self.total_processing_time += state["totalProcessingTime"]
+        for x in state["mergedTransactionAmountIntervals"]:
+            merged = self.merged_transaction_amount_intervals[x["interval"]]
+            for key in ("total", "load", "transfer", "redeem", "split", "merge", "issue"):
+                merged[key] += x[key]
+        for section, cross in (("crossTypeOp", self.cross_type_op), ("crossOpType", self.cross_op_type),
+                               ("crossTypeError", self.cross_type_error), ("crossOpError", self.cross_op_error)):
+            for first, counts in state[section].items():
+                for second, count in counts.items():
+                    cross[first][second] += count
+        self.temporal.merge_state(state["temporal"])
+        self.transaction_stats.merge_state(state["transactionStats"])
+        self._add_error_docs(state["errorDocs"])
+        add_duplicate_tokens(self.merged_tokens, state["duplicateTokens"])
+        self.lists_truncated |= state["listsTruncated"]
+        self.bubbles.add(state)
+
+    def build(self, start_date: str, end_date: str) -> dict:
+        """The range summary document; None if no daily summaries were added."""
+        if not self.days:
+            return None
+
+        success_rate = (self.total_success / self.total_transactions) * 100 if self.total_transactions else 0
+        error_docs, duplicate_tokens, lists_truncated = self._bounded_lists()
+        return {
+            "start_time": start_date,
+            "end_time": end_date,
+            "type": dict(self.type_counts),
+            "operation": dict(self.operation_counts),
+            "error": dict(self.error_counts),
+            "errorDocs": error_docs,
+            "result": dict(self.result_counts),
+            "mergedTransactionAmountIntervals": [
+                {"interval": key, **value} for key, value in self.merged_transaction_amount_intervals.items()
+            ],
+            "total": self.total_transactions,
+            "successRate": success_rate,
+            "crossTypeOp": self.cross_type_op,
+            "crossOpType": self.cross_op_type,
+            "crossTypeError": self.cross_type_error,
+            "crossOpError": self.cross_op_error,
+            "duplicateTokens": duplicate_tokens,
+            "listsTruncated": lists_truncated,
+            "temporal": self.temporal.build(),
+            **self.transaction_stats.build(),
+            **self.bubbles.build()
+        }
@@ -0,0 +1,162 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from pymongo.collection import Collection
+from app.services.range_summary import RANGE_SUMMARY_PROJECTION, RangeSummaryAccumulator
+
+logger = logging.getLogger(__name__)
+
+# Rollup nodes live in the overall summary collection, one document per period:
+#   {"_id": "month:2025-04", "level": "month", "start": "2025-04-01", "end": "2025-04-30", "days": 12, "state": {...}}
+# "state" is a RangeSummaryAccumulator.to_state() over the period's daily summaries,
+# including its errorDocs and duplicateTokens cut to the RANGE_* limits.
+# Weeks and months are rebuilt from their days, years from their months and
+# "all" from the years, so re-ingesting a day never counts it twice.
+ROLLUP_LEVELS = ("week", "month", "year", "all")
+
+def rollup_id(level: str, day: date) -> str:
+    if level == "week":
+        iso_year, iso_week, _ = day.isocalendar()
+        return f"week:{iso_year}-W{iso_week:02d}"
+    if level == "month":
+        return f"month:{day:%Y-%m}"
+    if level == "year":
+        return f"year:{day.year}"
+    return "all"
+
+def rollup_span(level: str, day: date):
+    """First and last day of the `level` period containing `day`."""
+    if level == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if level == "month":
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    if level == "year":
+        return date(day.year, 1, 1), date(day.year, 12, 31)
+    raise ValueError(f"Rollup level '{level}' has no fixed span")
+
+def _day_str(day: date) -> str:
+    return day.strftime("%Y-%m-%d")
+
+def _parse_day(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def _save_node(overall_collection: Collection, node_id: str, level: str, accumulator: RangeSummaryAccumulator,
+               start: str, end: str):
+    if not accumulator.days:
+        overall_collection.delete_one({"_id": node_id})
+        return
+    overall_collection.replace_one({"_id": node_id}, {
+        "_id": node_id,
+        "level": level,
+        "start": start,
+        "end": end,
+        "days": accumulator.days,
+        "state": accumulator.to_state(),
+        "updated_at": datetime.now(timezone.utc)
+    }, upsert=True)
+
+def _rebuild_from_days(daily_collection: Collection, overall_collection: Collection, level: str, day: date):
+    start, end = rollup_span(level, day)
+    accumulator = RangeSummaryAccumulator()
+    first = last = None
+    cursor = daily_collection.find(
+        {"date": {"$gte": _day_str(start), "$lte": _day_str(end)}}, RANGE_SUMMARY_PROJECTION
+    ).sort("date", 1)
+    for doc in cursor:
+        accumulator.add(doc)
+        first = first or doc["date"]
+        last = doc["date"]
+    _save_node(overall_collection, rollup_id(level, day), level, accumulator, first, last)
+
+def _rebuild_from_nodes(overall_collection: Collection, node_id: str, level: str, query: dict):
+    accumulator = RangeSummaryAccumulator()
+    first = last = None
+    for node in overall_collection.find(query).sort("start", 1):
+        accumulator.merge_state(node["state"])
+        first = first or node["start"]
+        last = node["end"]
+    _save_node(overall_collection, node_id, level, accumulator, first, last)
+
+def update_rollups(date_str: str, daily_collection: Collection, overall_collection: Collection):
+    """Refresh every rollup containing the day `date_str` after its daily summary was (re)written."""
+    day = _parse_day(date_str)
+    _rebuild_from_days(daily_collection, overall_collection, "week", day)
+    _rebuild_from_days(daily_collection, overall_collection, "month", day)
+    _rebuild_from_nodes(overall_collection, rollup_id("year", day), "year",
+                        {"level": "month", "start": {"$regex": f"^{day.year}-"}})
+    _rebuild_from_nodes(overall_collection, "all", "all", {"level": "year"})
+    logger.info(f"Rollups updated for {date_str}")
+
+def rebuild_rollups(daily_collection: Collection, overall_collection: Collection):
+    """Build every rollup from scratch, e.g. for daily summaries written before rollups existed."""
+    days = sorted(_parse_day(d) for d in daily_collection.distinct("date"))
+    overall_collection.delete_many({"level": {"$in": list(ROLLUP_LEVELS)}})
+    for level in ("week", "month"):
+        for node_day in {rollup_span(level, day)[0] for day in days}:
+            _rebuild_from_days(daily_collection, overall_collection, level, node_day)
+    for year in sorted({day.year for day in days}):
+        _rebuild_from_nodes(overall_collection, f"year:{year}", "year",
+                            {"level": "month", "start": {"$regex": f"^{year}-"}})
+    _rebuild_from_nodes(overall_collection, "all", "all", {"level": "year"})
+    logger.info(f"Rebuilt rollups for {len(days)} daily summaries")
+
+def ensure_rollups(daily_collection: Collection, overall_collection: Collection):
+    """Backfill the rollups if daily summaries exist but no "all" node does, or it predates the kept lists."""
+    all_node = overall_collection.find_one({"_id": "all"}, {"state.listsTruncated": 1})
+    if (all_node is None or "listsTruncated" not in all_node.get("state", {})) and daily_collection.find_one({}, {"_id": 1}):
+        rebuild_rollups(daily_collection, overall_collection)
+
+def plan_range(start: date, end: date):
+    """
+    Cover [start, end] with as few rollup periods as possible: whole years,
+    then whole months, then whole weeks, then single days. Returns
+    (node_ids, days) in date order; a period is used only if it lies
+    entirely inside the range.
+    """
+    node_ids, days = [], []
+    day = start
+    while day <= end:
+        for level in ("year", "month", "week"):
+            span_start, span_end = rollup_span(level, day)
+            if span_start == day and span_end <= end:
+                node_ids.append((day, rollup_id(level, day)))
+                day = span_end + timedelta(days=1)
+                break
+        else:
+            days.append(day)
+            day += timedelta(days=1)
+    return node_ids, days
+
+def summarize_range(daily_collection: Collection, overall_collection: Collection, start_date: str, end_date: str):
+    """
+    Range summary from pre-merged rollups: O(log n) rollup nodes plus at
+    most a few edge days are merged, instead of every day in the range.
+    errorDocs and duplicateTokens come from the same nodes and days, so
+    they are bounded like the rollups' (see listsTruncated).
+    Returns None if the range holds no daily summaries.
+    """
+    start, end = _parse_day(start_date), _parse_day(end_date)
+    accumulator = RangeSummaryAccumulator()
+
+    all_node = overall_collection.find_one({"_id": "all"})
+    if all_node is not None and start_date <= all_node["start"] and all_node["end"] <= end_date:
+        accumulator.merge_state(all_node["state"])
+    else:
+        node_ids, days = plan_range(start, end)
+        nodes = {node["_id"]: node for node in overall_collection.find({"_id": {"$in": [i for _, i in node_ids]}})}
+        day_docs = {doc["date"]: doc for doc in daily_collection.find(
+            {"date": {"$in": [_day_str(day) for day in days]}}, RANGE_SUMMARY_PROJECTION)}
+
+        # Merge in date order so first-seen keys come out as a day-by-day scan would
+        parts = [(day, nodes.get(node_id)) for day, node_id in node_ids] + [(day, None) for day in days]
+        for day, node in sorted(parts, key=lambda part: part[0]):
+            if node is not None:
+                accumulator.merge_state(node["state"])
+            elif _day_str(day) in day_docs:
+                accumulator.add(day_docs[_day_str(day)])
+
+    if not accumulator.days:
+        return None
+    return accumulator.build(start_date, end_date)
@@ -1,18 +1,112 @@
-from typing import Dict
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
 
 task_status: Dict[str, dict] = {}
+# Tasks are updated from ingest and bulk writer threads while the API reads them
+_lock = threading.Lock()
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
 
 def create_task(task_id: str, user: str):
-    from datetime import datetime, timezone
-    task_status[task_id] = {
-        "status": "processing",
-        "user": user,
-        "authenticated": True,
-        "auth_time": datetime.now(timezone.utc).isoformat()
-    }
+    with _lock:
+        task_status[task_id] = {
+            "status": "processing",
+            "user": user,
+            "authenticated": True,
+            "auth_time": _now(),
+            "progress": {"current": 0, "total": 0, "message": "Queued"},
+            "timeline": [],
+            "_started": time.perf_counter()
+        }
 
 def update_task(task_id: str, data: dict):
-    task_status[task_id].update(data)
+    with _lock:
+        task_status[task_id].update(data)
+
+def _close_stage(task: dict, outcome: str):
+    stages = task["timeline"]
+    if stages and stages[-1]["endedAt"] is None:
+        stage = stages[-1]
+        stage["endedAt"] = _now()
+        stage["durationSecs"] = time.perf_counter() - stage["_started"]
+        stage["outcome"] = outcome
+        task["_ended"] = time.perf_counter()
+
+def start_stage(task_id: str, stage: str, total: int = 0, message: Optional[str] = None):
+    """Close the running stage and start timing `stage`; `total` is how many units it will process, if known."""
+    with _lock:
+        task = task_status[task_id]
+        _close_stage(task, "completed")
+        task["timeline"].append({
+            "stage": stage,
+            "startedAt": _now(),
+            "endedAt": None,
+            "current": 0,
+            "total": total,
+            "records": 0,
+            "bytes": 0,
+            "message": message or stage,
+            "_started": time.perf_counter()
+        })
+
+def advance_stage(task_id: str, records: int = 0, bytes: int = 0, current: Optional[int] = None,
+                  total: Optional[int] = None, message: Optional[str] = None):
+    """
+    Add processed records/bytes to the running stage. Progress is counted in
+    `current` units (files while parsing, records while storing), which
+    follow the record count unless given.
+    """
+    with _lock:
+        stages = task_status[task_id]["timeline"]
+        if not stages or stages[-1]["endedAt"] is not None:
+            return
+        stage = stages[-1]
+        stage["records"] += records
+        stage["bytes"] += bytes
+        stage["current"] = stage["current"] + records if current is None else current
+        if total is not None:
+            stage["total"] = total
+        if message is not None:
+            stage["message"] = message
+
+def end_stage(task_id: str, outcome: str = "completed"):
+    with _lock:
+        _close_stage(task_status[task_id], outcome)
+
+def _stage_view(stage: dict, now: float) -> dict:
+    view = {key: value for key, value in stage.items() if not key.startswith("_")}
+    elapsed = view.get("durationSecs", now - stage["_started"])
+    view["elapsedSecs"] = elapsed
+    view["recordsPerSec"] = stage["records"] / elapsed if elapsed > 0 else None
+    view["mbPerSec"] = stage["bytes"] / 1e6 / elapsed if elapsed > 0 else None
+    if stage["endedAt"] is None and stage["total"] and stage["current"]:
+        # Assumes the rest of the stage runs at its average rate so far
+        view["etaSecs"] = elapsed * (stage["total"] - stage["current"]) / stage["current"]
+    return view
 
 def get_task(task_id: str):
-    return task_status.get(task_id)
+    """Snapshot of the task with elapsed times and rates filled in; progress follows the running stage."""
+    with _lock:
+        task = task_status.get(task_id)
+        if task is None:
+            return None
+        now = time.perf_counter()
+        view = {key: value for key, value in task.items() if not key.startswith("_")}
+        view["timeline"] = [_stage_view(stage, now) for stage in task["timeline"]]
+        running = task["timeline"] and task["timeline"][-1]["endedAt"] is None
+        view["elapsedSecs"] = (now if running or "_ended" not in task else task["_ended"]) - task["_started"]
+
+    running = view["timeline"][-1] if view["timeline"] else None
+    if running is not None and running["endedAt"] is None:
+        view["progress"] = {
+            "current": running["current"],
+            "total": running["total"],
+            "message": running["message"],
+            "stage": running["stage"],
+            "recordsPerSec": running["recordsPerSec"],
+            "etaSecs": running.get("etaSecs")
+        }
+    return view
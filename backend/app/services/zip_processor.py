@@ -1,100 +1,181 @@
-import tempfile, zipfile, shutil, logging
+import zipfile, logging, heapq, os, tempfile
+from concurrent.futures import as_completed
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime, timezone
-from app.utils.log_parser import parser_log_file_from_content, combine_logs
+from app.core.config import settings
+from app.utils.log_parser import (
+    iter_zip_member_chunks, parse_log_chunks, parse_log_events, parse_zip_member, iter_spilled_events, combine_log_events
+)
+from app.utils.process_pool_processing import run_in_process_pool
+from app.utils.transaction_batch import JsonRecordWriter
 from app.utils.log_storage import LogStorageService
-from .task_manager import update_task
-from app.api.analytics import generate_summary_report
+from .task_manager import update_task, start_stage, advance_stage, end_stage
+from app.api.analytics import generate_summary_report, save_ingest_summary_report
+from app.services.daily_summary import DailySummaryAccumulator
 from app.utils.performance_monitor import performance_monitor
+from app.utils.mongo_monitoring import mongo_operation
+from app.utils.metrics import registry
 import time
 
 
 logger = logging.getLogger(__name__)
 
-@performance_monitor
-def process_zip_file(task_id: str, file_path: str, user_info: dict):
-    try:
+# Extraction, parsing, combining and storing are streamed together, so "store" covers
+# them all; "parse" is only timed on its own when members are parsed in worker processes
+INGEST_STAGE_SECONDS = registry.histogram("ingest_stage_seconds", "Duration of each ingest stage", ("stage",))
+INGEST_RUNS = registry.counter("ingest_runs", "Archives processed", ("outcome",))
+INGEST_RECORDS = registry.counter("ingest_records", "Transaction records stored")
+INGEST_LOG_LINES = registry.counter("ingest_log_lines", "Log records parsed")
+INGEST_BYTES = registry.counter("ingest_bytes", "Uncompressed archive bytes ingested")
+INGEST_RECORDS_PER_SEC = registry.gauge("ingest_last_records_per_second", "Records per second of the last completed ingest")
+INGEST_MB_PER_SEC = registry.gauge("ingest_last_megabytes_per_second", "Uncompressed MB per second of the last completed ingest")
 
-        temp_dir = tempfile.mkdtemp()
-        extracted_files = []
-        # Update status to extraction
-        logger.info("Starting file extraction")
-        update_task(task_id, {
-            "status": "extracting files",
-            "progress": {"current": 0, "total": 0}
-        })
+def iter_zip_logs(task_id: str, file_path: str, stats: dict):
+    """
+    Stream parsed log records out of every file in the archive, merged by timestamp.
 
-        unzipping_start = time.perf_counter()
-        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-            total_files = len([f for f in zip_ref.filelist if not f.is_dir()])
-            processed_files = 0
-            
-            for zip_info in zip_ref.infolist():
-                if zip_info.is_dir():
-                    continue
-                extracted_path = zip_ref.extract(zip_info, temp_dir)
-                extracted_files.append(extracted_path)
-                processed_files += 1
-
-                update_task(task_id, {
-                    "status": "extracting_files",
-                    "progress": {
-                        "current": processed_files,
-                        "total": total_files,
-                        "message": f"Extracting file {processed_files} of {total_files}"
-                    }
-                })
-        
-        unzipping_time = time.perf_counter() - unzipping_start
-        print(f"Unzipping: {unzipping_time:.6f} seconds")
-
-        # Update status to parsing
-        logger.info("Starting log parsing")
-        update_task(task_id, {
-            "status": "parsing_logs",
-            "progress": {"current": 0, "total": len(extracted_files)}
-        })
+    Members are read side by side rather than one after another, so the
+    correlator sees a request file and its response file interleaved in log
+    time instead of one running hours ahead of the other.
+    """
+    with zipfile.ZipFile(file_path, 'r') as zip_ref:
+        members = [f for f in zip_ref.infolist() if not f.is_dir()]
+        total_files = len(members)
+        parsed = {"files": 0}
 
-        parsing_start = time.perf_counter()
-        all_parsed_logs = []
-        for file in extracted_files:
+        def member_logs(zip_info):
             try:
-                with open(file, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    logs = parser_log_file_from_content(content)
-                    all_parsed_logs.extend(logs)
+                chunks = iter_zip_member_chunks(zip_ref, zip_info, settings.ZIP_READ_CHUNK_SIZE)
+                for log in parse_log_chunks(chunks):
+                    stats["logs"] += 1
+                    yield log
+                stats["files"] += 1
             except Exception as e:
-                logger.warning(f"Failed to parse file {file}: {e}")
-        logger.info(f"Parsed {len(all_parsed_logs)} logs from {len(extracted_files)} files.")
-        parsing_time = time.perf_counter() - parsing_start
-        print(f"Parsing: {parsing_time:.6f} seconds")
-
-        logger.info("Starting logs to dataframe conversion")
-        if all_parsed_logs:
-            update_task(task_id, {
-                "status": "processing_records",
-                "progress": {"current": 0, "total": len(all_parsed_logs)}
-            })
-            df = combine_logs(all_parsed_logs)
-            records = df.to_dict("records")
-
-            logger.info("Storing data in mongodb")
-            update_task(task_id, {
-                "status": "storing_data",
-                "progress": {"current": 0, "total": len(records)}
-            })
-            info = LogStorageService.store_logs_batch(records)
-            df.to_json(f"{file_path}_{task_id}_output.json", orient="records")
+                logger.warning(f"Failed to parse file {zip_info.filename}: {e}")
+            parsed["files"] += 1
+            # The running stage counts stored records; files only show up in its message
+            advance_stage(task_id, bytes=zip_info.file_size, message=f"Parsed file {parsed['files']} of {total_files}")
+
+        # Ties keep member order, as on the parallel path
+        yield from heapq.merge(*(member_logs(zip_info) for zip_info in members), key=itemgetter("timestamp"))
+
+def iter_zip_events_parallel(task_id: str, file_path: str, members: list, stats: dict):
+    """
+    Parse archive members in worker processes and merge their events by timestamp.
+
+    Each worker spills the events of one member to a temporary file in file
+    order; once all are parsed the files are streamed back and k-way merged,
+    so the parent only ever holds one batch per member. The "parse" stage
+    ends, and "store" starts, when the merge begins.
+    """
+    with tempfile.TemporaryDirectory(prefix="ingest-", dir=settings.INGEST_SPILL_DIR) as spill_dir:
+        spill_paths = [os.path.join(spill_dir, f"{index}.events") for index in range(len(members))]
+        total_files = len(members)
+        parsed = set()
+        with INGEST_STAGE_SECONDS.time(stage="parse"):
+            futures = {
+                run_in_process_pool(
+                    parse_zip_member, file_path, zip_info.filename, settings.ZIP_READ_CHUNK_SIZE, spill_paths[index]
+                ): index
+                for index, zip_info in enumerate(members)
+            }
+            for processed_files, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                event_count = 0
+                try:
+                    event_count = future.result()
+                    parsed.add(index)
+                    stats["logs"] += event_count
+                    stats["files"] += 1
+                except Exception as e:
+                    logger.warning(f"Failed to parse file {members[index].filename}: {e}")
+                advance_stage(task_id, records=event_count, bytes=members[index].file_size, current=processed_files,
+                              message=f"Parsed file {processed_files} of {total_files}")
+        start_stage(task_id, "store", message="Storing records")
+
+        # Merged in member order, so events with equal timestamps come out as on the in-process path
+        runs = [iter_spilled_events(spill_paths[index]) for index in sorted(parsed)]
+        yield from heapq.merge(*runs, key=itemgetter("timestamp"))
+
+def iter_zip_events(task_id: str, file_path: str, stats: dict):
+    """
+    Pick the parallel parse stage for large archives and the in-process stream
+    otherwise, and start the task stage the events are produced under.
+    """
+    with zipfile.ZipFile(file_path, 'r') as zip_ref:
+        members = [f for f in zip_ref.infolist() if not f.is_dir()]
+    uncompressed_size = sum(f.file_size for f in members)
+    stats["bytes"] = uncompressed_size
+
+    if settings.PARSE_WORKERS > 1 and len(members) > 1 and uncompressed_size >= settings.PARALLEL_PARSE_MIN_BYTES:
+        logger.info(f"Parsing {len(members)} files ({uncompressed_size} bytes) with {settings.PARSE_WORKERS} worker processes")
+        start_stage(task_id, "parse", total=len(members), message="Parsing files")
+        return iter_zip_events_parallel(task_id, file_path, members, stats)
+    start_stage(task_id, "store", message="Storing records")
+    return parse_log_events(iter_zip_logs(task_id, file_path, stats))
+
+def iter_document_batches(task_id: str, file_path: str, json_writer: JsonRecordWriter, stats: dict):
+    """
+    Stream the archive as batches of transaction documents: each batch the
+    correlator completes is serialised to the JSON output and then handed on
+    to be stored, so only one batch is materialised at a time.
+    """
+    for batch in combine_log_events(iter_zip_events(task_id, file_path, stats)):
+        documents = batch.to_documents()
+        del batch
+        json_writer.write(documents)
+        stats["records"] += len(documents)
+        yield documents
+
+@performance_monitor
+def process_zip_file(task_id: str, file_path: str, user_info: dict):
+    try:
+        # Members are streamed straight out of the archive and parsed record by
+        # record; paired transactions then flow through serialisation, storage
+        # and the daily summary one batch at a time, so memory stays bounded
+        # whatever the size of the archive.
+        logger.info("Starting streaming ingestion")
+        update_task(task_id, {"status": "storing_data"})
+
+        ingest_start = time.perf_counter()
+        stats = {"logs": 0, "files": 0, "bytes": 0, "records": 0}
+        # Without the temp collection the summary is accumulated while storing
+        summary = None if settings.USE_TEMP_COLLECTION else DailySummaryAccumulator()
+        with JsonRecordWriter(f"{file_path}_{task_id}_output.json") as json_writer:
+            batches = iter_document_batches(task_id, file_path, json_writer, stats)
+            with mongo_operation("ingest:store"), INGEST_STAGE_SECONDS.time(stage="store"):
+                info = LogStorageService.store_logs_batch(
+                    batches, summary, progress=lambda stored: advance_stage(task_id, records=stored)
+                )
+        record_count = stats["records"]
+        logger.info(f"Parsed {stats['logs']} logs from {stats['files']} files into {record_count} transactions.")
+        logger.info(f"Parsing, combining and storing: {time.perf_counter() - ingest_start:.6f} seconds")
+        INGEST_LOG_LINES.inc(stats["logs"])
+        INGEST_BYTES.inc(stats["bytes"])
+        INGEST_RECORDS.inc(record_count)
+        if info.get("errors"):
+            logger.warning(f"{info['errors']} log writes failed; the daily summary only counts the stored transactions")
 
+        if stats["logs"]:
             logger.info("Starting Analysis")
-            update_task(task_id, {
-                "status": "Analysing data",
-                "progress": "Slow"
-            })
-            generate_summary_report()
+            update_task(task_id, {"status": "Analysing data"})
+            start_stage(task_id, "analyse", message="Building summary reports")
+            with mongo_operation("ingest:analyse"), INGEST_STAGE_SECONDS.time(stage="analyse"):
+                if summary is None:
+                    generate_summary_report()
+                else:
+                    save_ingest_summary_report(summary, info.get("duplicate_tokens", []))
 
+        elapsed = time.perf_counter() - ingest_start
+        if elapsed > 0:
+            INGEST_RECORDS_PER_SEC.set(record_count / elapsed)
+            INGEST_MB_PER_SEC.set(stats["bytes"] / 1e6 / elapsed)
+        INGEST_RUNS.inc(outcome="completed")
+        end_stage(task_id)
         update_task(task_id, {
             "status": "completed",
+            "progress": {"current": record_count, "total": record_count, "message": "Completed"},
             "user": user_info.get('username', 'unknown'),
             "filename": Path(file_path).name,
             "end_time": datetime.now(timezone.utc).isoformat()
@@ -102,11 +183,12 @@ def process_zip_file(task_id: str, file_path: str, user_info: dict):
 
     except Exception as e:
         logger.exception(f"Failed to process zip: {e}")
+        INGEST_RUNS.inc(outcome="failed")
+        end_stage(task_id, "failed")
         update_task(task_id, {
             "status": "failed", 
+            "progress": {"current": 0, "total": 0, "message": "Failed"},
             "error": str(e),
             "user": user_info.get('username', 'unknown'),
             "filename": Path(file_path).name
         })
-    finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
@@ -0,0 +1,85 @@
+from hashlib import blake2b
+import math
+import os
+import struct
+import threading
+
+# Magic, bits, hashes, items held and the capacity the filter was sized for
+_HEADER = struct.Struct("<8sQIQQ")
+_MAGIC = b"BLOOM002"
+
+class BloomFilter:
+    """
+    Bit-array Bloom filter over strings.
+
+    Positions come from double hashing one 128-bit blake2b digest, so each
+    lookup costs a single hash. Callers add each distinct item once, so
+    `count` is the number of items the filter holds.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, num_bits: int = None, num_hashes: int = None, bits: bytearray = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = num_bits or max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = num_hashes or max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+        self.lock = threading.Lock()
+
+    def _positions(self, item: str):
+        digest = blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str):
+        positions = self._positions(item)
+        with self.lock:
+            bits = self.bits
+            for p in positions:
+                bits[p >> 3] |= 1 << (p & 7)
+            self.count += 1
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+    def false_positive_rate(self) -> float:
+        """Expected false-positive rate at the current fill."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def save(self, path: str):
+        """Write the filter atomically (temp file + rename)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with self.lock:
+            header = _HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.count, self.capacity)
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                f.write(struct.pack("<d", self.error_rate))
+                f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size or not header.startswith(_MAGIC):
+                raise ValueError(f"{path} is not a Bloom filter file in the current format")
+            _, num_bits, num_hashes, count, capacity = _HEADER.unpack(header)
+            (error_rate,) = struct.unpack("<d", f.read(8))
+            bits = bytearray(f.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"{path} is truncated")
+        return cls(capacity, error_rate, num_bits=num_bits, num_hashes=num_hashes, bits=bits, count=count)
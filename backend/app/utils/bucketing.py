@@ -0,0 +1,69 @@
+from typing import List, Optional, Sequence
+import numpy as np
+from app.core.config import settings
+
+class BucketEdges:
+    """
+    Sorted bucket boundaries for amount histograms.
+
+    Bucket i covers [edges[i], edges[i + 1]); the last bucket also includes
+    its upper edge. indices() assigns a whole column of values to buckets with
+    one vectorized search, so histograms are built a batch at a time during
+    ingest rather than by a lookup per document.
+    """
+
+    def __init__(self, edges: Sequence[float], scale: str = "custom", base: float = 10):
+        edges = list(edges)
+        if len(edges) < 2:
+            raise ValueError("At least two bucket edges are required")
+        if any(lo >= hi for lo, hi in zip(edges, edges[1:])):
+            raise ValueError("Bucket edges must be strictly increasing")
+        if scale == "log" and edges[0] <= 0:
+            raise ValueError("Logarithmic bucket edges must start above zero")
+        self.edges = edges
+        self.scale = scale
+        self.base = base
+
+    @classmethod
+    def log(cls, count: int, start: float = 1, base: float = 10) -> "BucketEdges":
+        return cls([start * base ** i for i in range(count + 1)], "log", base)
+
+    @classmethod
+    def linear(cls, count: int, start: float, stop: float) -> "BucketEdges":
+        width = (stop - start) / count
+        return cls([start + width * i for i in range(count)] + [stop], "linear")
+
+    @classmethod
+    def custom(cls, edges: Sequence[float]) -> "BucketEdges":
+        return cls(sorted(edges), "custom")
+
+    def __len__(self):
+        return len(self.edges) - 1
+
+    @property
+    def labels(self) -> List[str]:
+        return [f"{_format_edge(lo)} - {_format_edge(hi)}" for lo, hi in zip(self.edges, self.edges[1:])]
+
+    def indices(self, values) -> np.ndarray:
+        """Bucket index of every value in a column, -1 where it is NaN or outside the edges."""
+        edges = np.asarray(self.edges, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        indices = np.searchsorted(edges, values, side="right") - 1
+        indices[values == edges[-1]] = len(edges) - 2
+        indices[~((values >= edges[0]) & (values <= edges[-1]))] = -1
+        return indices
+
+def _format_edge(value) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+def amount_bucket_edges(count: Optional[int] = None) -> BucketEdges:
+    """Amount bucket edges from settings; `count` overrides the configured number of buckets."""
+    scale = settings.AMOUNT_BUCKET_SCALE
+    count = count or settings.AMOUNT_BUCKET_COUNT
+    if scale == "custom":
+        return BucketEdges.custom(settings.AMOUNT_BUCKET_EDGES)
+    if scale == "linear":
+        return BucketEdges.linear(count, settings.AMOUNT_BUCKET_START, settings.AMOUNT_BUCKET_STOP)
+    if scale == "log":
+        return BucketEdges.log(count, settings.AMOUNT_BUCKET_START, settings.AMOUNT_BUCKET_BASE)
+    raise ValueError(f"Unknown amount bucket scale: {scale}")
@@ -0,0 +1,98 @@
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class BulkWriter:
+    """
+    Pipelined, chunked writes to several MongoDB targets.
+
+    Each target (e.g. "master", "temp", "tokens") gets its own writer thread,
+    so chunks for one target are applied in submission order while different
+    targets write concurrently. At most `max_pending_chunks` chunks may be
+    queued or in flight; submit() blocks beyond that, which keeps the producer
+    from buffering the whole upload. Finished chunks are handed back by
+    finished() and forgotten, so neither their operations nor their results
+    pile up. Every chunk's throughput is logged and accumulated in `stats`.
+    """
+
+    def __init__(self, targets, max_pending_chunks: int):
+        self.executors = {
+            target: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"bulk-{target}")
+            for target in targets
+        }
+        self.slots = threading.BoundedSemaphore(max_pending_chunks)
+        # Chunks not yet handed back by finished(): (future, context) in submission order
+        self.pending = {target: deque() for target in targets}
+        self.stats = {target: {"chunks": 0, "operations": 0, "seconds": 0.0} for target in targets}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            for chunks in self.pending.values():
+                for future, _ in chunks:
+                    future.cancel()
+        self.shutdown()
+        return False
+
+    def submit(self, target: str, write, operations: list, context=None):
+        """
+        Queue write(operations) on the target's writer; blocks while too many
+        chunks are pending. `context` is handed back with the chunk by finished().
+        """
+        self.slots.acquire()
+        try:
+            # Writes run with the caller's context, e.g. its MongoDB operation label
+            future = self.executors[target].submit(contextvars.copy_context().run, self._write, target, write, operations)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        self.pending[target].append((future, context))
+        return future
+
+    def _write(self, target: str, write, operations: list):
+        start = time.perf_counter()
+        result = write(operations)
+        elapsed = time.perf_counter() - start
+
+        stats = self.stats[target]
+        stats["chunks"] += 1
+        stats["operations"] += len(operations)
+        stats["seconds"] += elapsed
+        rate = len(operations) / elapsed if elapsed > 0 else float("inf")
+        logger.info(f"{target} chunk {stats['chunks']}: {len(operations)} ops in {elapsed:.3f}s ({rate:.0f} ops/s)")
+        return result
+
+    def finished(self, target: str, wait_all: bool = False):
+        """
+        Remove and return (future, context) for the target's chunks that are
+        done, in submission order and stopping at the first unfinished one;
+        with wait_all, wait for every pending chunk.
+        """
+        chunks = self.pending[target]
+        done = []
+        while chunks and (wait_all or chunks[0][0].done()):
+            future, context = chunks.popleft()
+            wait((future,))
+            done.append((future, context))
+        return done
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=True)
+
+    def throughput(self):
+        return {
+            target: {
+                **stats,
+                "ops_per_sec": stats["operations"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+            }
+            for target, stats in self.stats.items()
+        }
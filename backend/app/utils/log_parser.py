@@ -1,70 +1,180 @@
-import pandas as pd
 import re
 import base64
 import json
+import pickle
+import zipfile
+from typing import Iterable, Iterator, Dict
+from app.core.config import settings
 from app.utils.performance_monitor import performance_monitor
-pd.set_option('future.no_silent_downcasting', True)
+from app.utils.transaction_correlator import TransactionCorrelator
+from app.utils.transaction_batch import TransactionBatch
+
+# A record starts on any line that begins with an ISO-8601 timestamp; the header
+# pattern is only ever applied at those positions, never across a whole file.
+RECORD_START_PATTERN = re.compile(rb'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z', re.MULTILINE)
+RECORD_HEADER_PATTERN = re.compile(
+    rb'(?P<timestamp>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z)\s+(?P<level>\w+)\s+(?P<module>[\w:]+(?:\{[^\}]+\})?):\s+'
+)
+# Events per pickled batch when a worker spills a parsed member to disk
+SPILL_BATCH_SIZE = 4096
 
 @performance_monitor
 def parser_log_file_from_content(content: str):
-    log_pattern = re.compile(
-        r'(?P<timestamp>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z)\s+(?P<level>\w+)\s+(?P<module>[\w:]+(?:\{[^\}]+\})?):\s+(?P<message>.*?)(?=\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z|$)',
-        re.DOTALL
-    )
-
-    matches = log_pattern.findall(content)
-    parsed_logs = []
-    for match in matches:
-        parsed_logs.append({
-            'timestamp': match[0],  # e.g., 2025-04-25T14:11:19.206712Z
-            'level': match[1],      # e.g., INFO
-            'module': match[2],     # e.g., attestation::api::handlers::req_issue_token
-            'message': match[3].strip()
-        })
-
-    return parsed_logs
-
-def extract_field(text, field):
-    match = re.search(rf'{field}="([^"]+)"', text)
-    return match.group(1) if match else None
-
-def transaction_detail(text):
-    match=re.search(r'ResDetails type="([^"]+)" Operation="([^"]+)">',text)
-    return (match.group(1),match.group(2)) if match else (None,None)
-    
+    return list(parse_log_chunks([content.encode("utf-8")]))
+
+def parse_log_record(record: bytes):
+    """Split one raw record into its header fields and message, or None if it has no valid header."""
+    match = RECORD_HEADER_PATTERN.match(record)
+    if not match:
+        return None
+    return {
+        'timestamp': match.group('timestamp').decode('ascii'),  # e.g., 2025-04-25T14:11:19.206712Z
+        'level': match.group('level').decode('ascii'),          # e.g., INFO
+        'module': match.group('module').decode('utf-8'),        # e.g., attestation::api::handlers::req_issue_token
+        'message': record[match.end():].decode('utf-8', errors='replace').strip()
+    }
+
+def parse_log_chunks(chunks: Iterable[bytes]) -> Iterator[Dict[str, str]]:
+    """
+    Parse log records from a stream of UTF-8 byte chunks.
 
-def extract_msg_id(text):
-    return extract_field(text, "msgId")
+    Records are split on lines that start with a timestamp and yielded as soon
+    as the next record start has been seen, so a record spanning any number of
+    chunks is reassembled and only the unfinished tail is held in memory.
+    """
+    buffer = b""
+    for chunk in chunks:
+        # Line starts before the last complete newline have already been scanned
+        resume = max(buffer.rfind(b"\n"), 0)
+        buffer += chunk
+        starts = [m.start() for m in RECORD_START_PATTERN.finditer(buffer, resume) if m.start() > 0]
+        if not starts:
+            continue
+        begin = 0
+        for end in starts:
+            record = parse_log_record(buffer[begin:end])
+            if record is not None:
+                yield record
+            begin = end
+        buffer = buffer[begin:]
+    if buffer:
+        record = parse_log_record(buffer)
+        if record is not None:
+            yield record
 
-def extract_result(text):
-    match = re.search(r'<Resp reqMsgId="[^"]+" result="([^"]+)"', text)
-    return match.group(1) if match else None
+def iter_zip_member_chunks(zip_ref: zipfile.ZipFile, zip_info: zipfile.ZipInfo, chunk_size: int):
+    """Read a single archive member in fixed-size chunks without extracting it to disk."""
+    with zip_ref.open(zip_info) as member:
+        while True:
+            chunk = member.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
 
-def extract_result_2(text):
-    match = re.search(r'<Resp reqMsgId="[^"]+" result="[^"]+" errCode="([^"]+)"', text)
-    return match.group(1) if match else "Success"
+def parse_zip_member(file_path: str, member_name: str, chunk_size: int, spill_path: str) -> int:
+    """
+    Parse one archive member into request/response events spilled to `spill_path`.
 
-def extract_result_3(text):
-    match = re.search(r'<Resp reqMsgId="[^"]+" result="[^"]+" errCode="[^"]+" msg="([^"]+)"', text)
-    return match.group(1) if match else "Success"
+    Runs in a worker process, so it opens the archive itself and writes the
+    compact events to disk in file order, a batch at a time, rather than
+    holding the member or sending it back. Returns the number of events.
+    """
+    count = 0
+    with zipfile.ZipFile(file_path, 'r') as zip_ref, open(spill_path, 'wb') as spill:
+        chunks = iter_zip_member_chunks(zip_ref, zip_ref.getinfo(member_name), chunk_size)
+        batch = []
+        for event in parse_log_events(parse_log_chunks(chunks)):
+            batch.append(event)
+            if len(batch) == SPILL_BATCH_SIZE:
+                pickle.dump(batch, spill, pickle.HIGHEST_PROTOCOL)
+                count += len(batch)
+                batch = []
+        if batch:
+            pickle.dump(batch, spill, pickle.HIGHEST_PROTOCOL)
+            count += len(batch)
+    return count
 
-def extract_amount(text):
-    match = re.search(r'<Amount value="([^"]+)" curr="([^"]+)">', text)
-    return f"{match.group(1)} {match.group(2)}" if match else None
+def iter_spilled_events(spill_path: str):
+    """Stream the events written by parse_zip_member back, one batch in memory at a time."""
+    with open(spill_path, 'rb') as spill:
+        while True:
+            try:
+                batch = pickle.load(spill)
+            except EOFError:
+                return
+            yield from batch
 
-def is_request(msg): return '<ReqDetails' in msg
-def is_response(msg): return '<ResDetails' in msg
+# Every structural field combine_logs needs, as alternatives of one precompiled
+# pattern so a message is scanned once regardless of how many fields are read.
+# All alternatives share the leading "<", which keeps the scan a fast literal search.
+MESSAGE_FIELD_PATTERN = re.compile(
+    r'<(?:'
+    r'(?P<details>ReqDetails|ResDetails)(?: type="(?P<type>[^"]+)" Operation="(?P<operation>[^"]+)">)?'
+    r'|Resp reqMsgId="(?P<req_msg_id>[^"]+)" result="(?P<result>[^"]+)"(?: errCode="(?P<error_code>[^"]+)"(?: msg="(?P<error_msg>[^"]+)")?)?'
+    r'|Amount value="(?P<amount_value>[^"]+)" curr="(?P<amount_currency>[^"]+)">'
+    r'|Detail name="(?P<name>[^"]+)" value="(?P<value>[^"]+)"'
+    r')'
+)
+MSG_ID_PATTERN = re.compile(r'msgId="([^"]+)"')
+# Alternative that matched, keyed by the index of the last group it closes
+_DETAILS, _RESP, _AMOUNT, _DETAIL = range(4)
+_FIELD_KINDS = {1: _DETAILS, 3: _DETAILS, 5: _RESP, 6: _RESP, 7: _RESP, 9: _AMOUNT, 11: _DETAIL}
 
-def extract_attr_value(text, attr_name):
-    match = re.search(rf'name="{attr_name}" value="([^"]+)"', text)
-    return match.group(1) if match else None
+def extract_message_fields(text):
+    """
+    Extract all request/response fields of a message in one pass over its XML
+    structure, plus a first-match lookup of msgId.
+
+    The first occurrence of each field wins, matching the individual
+    extract_* helpers. `<Detail name=... value=...>` pairs are returned under
+    "attributes", except the base64 encoded "tag" values which are collected
+    in order under "tags".
+    """
+    fields = {
+        "msg_id": None,
+        "req_msg_id": None,
+        "is_request": False,
+        "is_response": False,
+        "type": None,
+        "operation": None,
+        "result": None,
+        "error_code": "Success",
+        "error_msg": "Success",
+        "amount": None,
+        "attributes": {},
+        "tags": []
+    }
+    msg_id = MSG_ID_PATTERN.search(text)
+    if msg_id:
+        fields["msg_id"] = msg_id.group(1)
+
+    attributes = fields["attributes"]
+    for match in MESSAGE_FIELD_PATTERN.finditer(text):
+        kind = _FIELD_KINDS[match.lastindex]
+        if kind == _DETAIL:
+            name, value = match.group("name", "value")
+            if name == "tag":
+                fields["tags"].append(value)
+            elif name not in attributes:
+                attributes[name] = value
+        elif kind == _DETAILS:
+            if match.group("details") == "ReqDetails":
+                fields["is_request"] = True
+            else:
+                fields["is_response"] = True
+                if match.group("type") is not None and fields["type"] is None:
+                    fields["type"], fields["operation"] = match.group("type", "operation")
+        elif kind == _RESP:
+            if fields["result"] is None:
+                fields["req_msg_id"], fields["result"] = match.group("req_msg_id", "result")
+                if match.group("error_code") is not None:
+                    fields["error_code"] = match.group("error_code")
+                    if match.group("error_msg") is not None:
+                        fields["error_msg"] = match.group("error_msg")
+        elif fields["amount"] is None:
+            fields["amount"] = f"{match.group('amount_value')} {match.group('amount_currency')}"
+    return fields
 
-def extract_tokens_from_msg(text):
-    matches = re.findall(r'<Detail name="tag" value="([^"]+)"', text)
-    return [decode_details(match) for match in matches] if matches else []
-def extract_tag_value(text,tag):
-    match=re.search(rf"{tag}[6>]>(.?)</{tag}>",text)
-    return match.group(1) if match else None
 def decode_details(encoded_data):
     if not encoded_data:
         return None
@@ -104,110 +214,83 @@ def extract_token_details(token, is_response):
             output_list.append(output_det)
         return (input_list, output_list)
     
-@performance_monitor
-def combine_logs(logs):
-    transaction = {}
-    indx=1
-    indx_2=1
+def parse_log_event(log):
+    """
+    Turn a parsed log record into a request or response event.
+
+    This is where all per-message regex and base64/JSON work happens, so it can
+    run in worker processes; the returned event only carries the transaction
+    columns under "data", not the raw message. Messages that are neither a
+    request nor a response have no "data"; records without a msgId give None.
+    """
+    fields = extract_message_fields(log['message'])
+    msg_id = fields["msg_id"]
+    if not msg_id:
+        return None
+    event = {
+        "timestamp": log["timestamp"],
+        "msg_id": msg_id,
+        "req_msg_id": fields["req_msg_id"],
+        "is_request": fields["is_request"]
+    }
+
+    if fields["is_request"]:
+        # Only the first tag of a request carries the inputs/outputs payload
+        tokens_data = decode_details(fields["tags"][0]) if fields["tags"] else None
+        input_list, output_list = extract_token_details(tokens_data, False) if tokens_data else ([], [])
+        input_amt_list = [float(i.get("value")) for i in input_list]
+        output_amt_list = [float(i.get("value")) for i in output_list]
+        attributes = fields["attributes"]
+
+        event["data"] = {
+            "SenderOrgId": attributes.get("senderOrgId"),
+            "ReceiverOrgId": attributes.get("receiverOrgId"),
+            "Transaction_Id": attributes.get("transactionId"),
+            "Amount": fields["amount"],
+            "Req_Tot_Amount": sum(input_amt_list),
+            "Req_input_amt_list": input_amt_list,
+            "Output_amt_list": output_amt_list,
+            "Inputs": input_list,
+            "Outputs": output_list
+        }
+    elif fields["is_response"]:
+        token_details_list = [extract_token_details(decode_details(tag), True) for tag in fields["tags"]]
+
+        event["data"] = {
+            "Type_Of_Transaction": fields["type"],
+            "Operation": fields["operation"],
+            "Responsetotamount": sum(float(i.get("value")) for i in token_details_list),
+            "Resptokens": token_details_list,
+            "Result_of_Transaction": fields["result"],
+            "ErrorCode": fields["error_code"],
+            "ErrorMsg": fields["error_msg"]
+        }
+    return event
+
+def parse_log_events(logs):
     for log in logs:
-        msg = log['message']
-        msg_id = extract_msg_id(msg)
-        if not msg_id:
-            continue
-        if msg_id not  in transaction:
-            transaction[indx]={"Msg_id":msg_id}
-
-        if is_request(msg):
-            tokens_data = extract_tokens_from_msg(msg)
-            input_list, output_list = extract_token_details(tokens_data[0], False) if tokens_data else ([], [])
-            tot_am=0
-            input_amt_list=[]
-            for i in input_list:
-                am=i.get("value")
-                input_amt_list.append(float(am))
-                tot_am=tot_am+float(am)
-            output_amt_list=[]
-            for  i in output_list:
-                am=i.get("value")
-                output_amt_list.append(float(am))
-            token_id=[]
-            for i in input_list:
-                am=i.get("id")
-                
-                token_id.append(am)
-          
-           
-            transaction[indx].update({
-                "Msg_id": msg_id,
-                "Request_timestamp": log["timestamp"],
-                "SenderOrgId": extract_attr_value(msg, "senderOrgId"),
-                "ReceiverOrgId": extract_attr_value(msg, "receiverOrgId"),
-                "Transaction_Id": extract_attr_value(msg, "transactionId"),
-                "Amount": extract_amount(msg),
-                "Req_Tot_Amount": tot_am,
-                "Req_input_amt_list": input_amt_list,
-                "Output_amt_list": output_amt_list,
-                "Inputs": input_list,
-                "Outputs": output_list
-            })
-            
-            indx=indx+1
-
-        elif is_response(msg):
-            tokens_data = extract_tokens_from_msg(msg)
-            token_details_list = [extract_token_details(token, True) for token in tokens_data]
-            tot_am=0
-            
-            input_amt_list =[]
-            for i in  token_details_list:
-                am=i.get("value")
-                input_amt_list.append(float(am))
-                tot_am=tot_am+float(am)
-            token_id=[]
-            for i in token_details_list:
-                am=i.get("id")
-                token_id.append(am)
-            type_value ,operation_value= transaction_detail(msg)
-         
-
-            transaction[indx_2].update({
-                "Response_timestamp": log["timestamp"],
-                "Type_Of_Transaction": type_value,
-                "Operation": operation_value,
-                "Responsetotamount": tot_am,
-                "Resptokens": token_details_list,
-                "Result_of_Transaction": extract_result(msg),
-                "ErrorCode": extract_result_2(msg),
-                "ErrorMsg": extract_result_3(msg)
-            })
-            indx_2=indx_2+1
-
-    df = pd.DataFrame(transaction.values())
-
-    # Parse timestamps with the correct format
-    df["Request_timestamp"] = pd.to_datetime(df["Request_timestamp"], utc=True)
-    df["Response_timestamp"] = pd.to_datetime(df["Response_timestamp"], utc=True)
-
-    # Replace NaT values with None for MongoDB compatibility
-    df["Request_timestamp"] = df["Request_timestamp"].where(df["Request_timestamp"].notna(), None)
-    df["Response_timestamp"] = df["Response_timestamp"].where(df["Response_timestamp"].notna(), None)
-
-    # Calculate time differences, only for valid timestamps
-    mask = df["Request_timestamp"].notna() & df["Response_timestamp"].notna()
-    df["Time_to_Transaction_secs"] = pd.Series(dtype='float64')  # Initialize with empty series
-    df.loc[mask, "Time_to_Transaction_secs"] = (
-        df.loc[mask, "Response_timestamp"] - df.loc[mask, "Request_timestamp"]
-    ).dt.total_seconds() * 1000
-
-    # Fill missing values with 0
-    df["Time_to_Transaction_secs"] = df["Time_to_Transaction_secs"].fillna(0)
-
-    # Convert success/failure to binary
-    df["Result_of_Transaction"] = df["Result_of_Transaction"].replace({'SUCCESS': 1, 'FAILURE': 0}).fillna(0).astype(int)
-
-    # Additional computed fields
-    df["input_amount"] = df["Req_Tot_Amount"].astype(float)
-    df["NumberOfInputs"] = df["Req_input_amt_list"].apply(lambda x: len(x) if isinstance(x, list) else 0)
-    df["NumberOfOutputs"] = df["Output_amt_list"].apply(lambda x: len(x) if isinstance(x, list) else 0)
-    df=df.dropna()
-    return df
\ No newline at end of file
+        event = parse_log_event(log)
+        if event is not None:
+            yield event
+
+def combine_logs(logs, batch_size: int = None):
+    return combine_log_events(parse_log_events(logs), batch_size)
+
+def combine_log_events(events, batch_size: int = None) -> Iterator[TransactionBatch]:
+    """
+    Pair request/response events and yield the completed transactions as
+    finalized batches of at most `batch_size` (INGEST_BATCH_SIZE by default).
+
+    Only the correlator's bounded pending tables and the batch being filled
+    are held, so memory does not grow with the number of transactions.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    correlator = TransactionCorrelator(settings.CORRELATION_MAX_PENDING, settings.CORRELATION_TIMEOUT_SECS)
+    batch = TransactionBatch()
+    for transaction in correlator.pair(events):
+        batch.append(transaction)
+        if len(batch) == batch_size:
+            yield batch.finalize()
+            batch = TransactionBatch()
+    if len(batch):
+        yield batch.finalize()
@@ -1,19 +1,41 @@
-
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable, Iterable
 from pymongo.errors import BulkWriteError
 from pymongo import UpdateOne
+from app.core.config import settings
 from app.database.database import get_collection, get_tokens_collection, get_temp_collection, get_temptoken_collection
 from datetime import datetime, timezone
 import logging
-import pandas as pd
 from bson import ObjectId
-import pytz
 import numpy as np
 import time
 from app.utils.performance_monitor import performance_monitor
+from app.utils.metrics import registry
+from app.utils.timestamps import us_to_datetimes
+from app.utils.bulk_writer import BulkWriter
+from app.utils.token_filter import get_token_filter, save_token_filter
+from app.services.daily_summary import DailySummaryAccumulator, summary_view
 
 logger = logging.getLogger(__name__)
 
+STORE_STEP_SECONDS = registry.histogram("ingest_store_step_seconds", "Duration of the steps of storing a batch of logs", ("step",))
+BULK_WRITE_OPERATIONS = registry.counter("ingest_bulk_write_operations", "Bulk write operations sent by ingest", ("target",))
+BULK_WRITE_RATE = registry.gauge("ingest_bulk_write_ops_per_second", "Write rate of the last ingest's bulk writes", ("target",))
+TOKEN_FILTER_LOOKUPS = registry.counter("token_filter_lookups", "Token ids screened by the token filter", ("result",))
+
+def written_documents(future, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The documents of an unordered insert_many chunk that were actually stored."""
+    error = future.exception()
+    if error is None:
+        return documents
+    if isinstance(error, BulkWriteError):
+        failed = {write_error["index"] for write_error in error.details.get("writeErrors", [])}
+        return [document for index, document in enumerate(documents) if index not in failed]
+    return []
+
+def chunked(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 def convert_objectid(obj):
     if isinstance(obj, list):
         return [convert_objectid(item) for item in obj]
@@ -27,234 +49,331 @@ def convert_objectid(obj):
 class LogStorageService:
     @staticmethod
     def convert_timestamp(ts):
-        """Convert timestamp in milliseconds to UTC datetime"""
-        if ts is None or pd.isna(ts):
-            return None
+        """Convert epoch microseconds (as produced by the transaction batch) to a naive UTC datetime"""
+        if ts is None or isinstance(ts, datetime):
+            return ts
         try:
-            # If ts is a Timestamp, convert to datetime
-            if isinstance(ts, pd.Timestamp):
-                return ts.to_pydatetime().replace(tzinfo=pytz.UTC)
-            # Otherwise, assume it's a millisecond timestamp
-            return datetime.fromtimestamp(ts / 1000.0, tz=pytz.UTC)
+            return us_to_datetimes(np.asarray([ts], dtype=np.int64))[0]
         except (TypeError, ValueError) as e:
             logger.warning(f"Failed to convert timestamp {ts}: {str(e)}")
             return None
 
-    @staticmethod
-    def clean_log_entry(log_entry: Dict[str, Any]) -> Dict[str, Any]:
-        """Clean and convert all fields in the log entry"""
-        # Convert timestamps
-        log_entry['Request_timestamp'] = LogStorageService.convert_timestamp(log_entry.get('Request_timestamp'))
-        log_entry['Response_timestamp'] = LogStorageService.convert_timestamp(log_entry.get('Response_timestamp'))
-        
-        if log_entry['Request_timestamp'] is None:
-            logger.warning(f"Missing valid Request_timestamp for Msg_id {log_entry.get('Msg_id')}")
-        
-        # Convert NaN/None values to None for MongoDB, but skip arrays/lists
-        for key, value in log_entry.items():
-            # Skip nested structures (lists, dicts, or NumPy arrays)
-            if isinstance(value, (list, dict, pd.Series, np.ndarray)):
-                logger.debug(f"Skipping NaN check for field '{key}' with value {value} (type: {type(value)})")
-                continue
-            try:
-                if pd.isna(value):
-                    log_entry[key] = None
-            except ValueError as e:
-                logger.error(f"Error checking NaN for field '{key}' with value {value}: {str(e)}")
-                continue
-        
-        return log_entry
-
     @performance_monitor
     @staticmethod
-    def store_logs_batch(parsed_logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def store_logs_batch(batches: Iterable[List[Dict[str, Any]]], summary: Optional[DailySummaryAccumulator] = None,
+                         progress: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """
+        Store transaction documents as they are produced, a batch at a time;
+        `batches` may be a generator, so the upload is never held whole.
+        `progress`, if given, is called with the size of each chunk of logs
+        once it is written to the master collection.
+        """
         start_time = time.perf_counter()
     
         collection = get_collection()
         tokens_collection = get_tokens_collection()
         temp_collection = get_temp_collection()
         temptoken_collection = get_temptoken_collection()
+        use_temp = settings.USE_TEMP_COLLECTION
+        log_targets = ("master", "temp") if use_temp else ("master",)
 
         # Clear temp collections
         try:
             temp_clear_start = time.perf_counter()
-            temp_collection.delete_many({})
+            if use_temp:
+                temp_collection.delete_many({})
             temptoken_collection.delete_many({})
             logger.info("Temporary collections cleared successfully.")
             temp_clear_time = time.perf_counter() - temp_clear_start
-            print(f"Temp collection clear: {temp_clear_time:.6f} seconds")
+            STORE_STEP_SECONDS.observe(temp_clear_time, step="clear_temp")
+            logger.info(f"Temp collection clear: {temp_clear_time:.6f} seconds")
         except Exception as e:
             logger.error(f"Error clearing temporary collection: {str(e)}")
 
-        if not parsed_logs:
-            logger.info("No logs to store.")
-            return {"inserted": 0, "errors": 0, "tokens_inserted": 0, "tokens_updated": 0}
-
         tokens = []
         tokenIds = []
         logs_to_insert = []
+        # Results of the chunks written so far; each chunk is counted once it finishes and then dropped
+        counts = {"logs_inserted": 0, "log_errors": 0, "tokens_upserted": 0, "tokens_modified": 0, "tokens_matched": 0}
+        token_write_errors = []
+        write_failures = []
+        # Token ids already probed in this upload; ids probed earlier may have been
+        # written since, so they must not be probed again
+        seen_token_ids = set()
+        # New token ids whose writes have not been confirmed yet; they join the filter once they are
+        unconfirmed_ids = set()
+        queued_token_operations = 0
+        queued_logs = 0
+        token_filter = get_token_filter()
+        filter_stats = {"screened": 0, "lookups": 0, "false_positives": 0}
+
+        def insert_logs(collection_):
+            return lambda docs: collection_.insert_many(docs, ordered=False)
+
+        def report_written(count):
+            def done(future):
+                if future.exception() is None:
+                    progress(count)
+            return done
+
+        def flush_logs(writer):
+            nonlocal logs_to_insert
+            if logs_to_insert:
+                # The documents ride along so the summary can count what was actually stored
+                future = writer.submit("master", insert_logs(collection), logs_to_insert, logs_to_insert)
+                if progress is not None:
+                    future.add_done_callback(report_written(len(logs_to_insert)))
+                if use_temp:
+                    writer.submit("temp", insert_logs(temp_collection), logs_to_insert)
+                logs_to_insert = []
+
+        def flush_tokens(writer, chunk_token_ids):
+            nonlocal tokens, queued_token_operations
+            if tokens:
+                queued_token_operations += len(tokens)
+                # Only tokens that existed before this upload count as duplicates,
+                # so each chunk is probed before its own writes are queued
+                new_ids = [token_id for token_id in dict.fromkeys(chunk_token_ids) if token_id not in seen_token_ids]
+                seen_token_ids.update(new_ids)
+                # A filter miss means the token was never stored, so only hits are looked up
+                candidates = [token_id for token_id in new_ids if token_id in token_filter]
+                existing = LogStorageService.find_existing_token_ids(tokens_collection, candidates)
+                tokenIds.extend(existing)
+                existing_ids = set(existing)
+                unconfirmed_ids.update(token_id for token_id in new_ids if token_id not in existing_ids)
+                filter_stats["screened"] += len(new_ids)
+                filter_stats["lookups"] += len(candidates)
+                filter_stats["false_positives"] += len(candidates) - len(existing)
+                # The token id of every operation rides along, so collect() knows which ids were written
+                writer.submit("tokens", lambda ops: tokens_collection.bulk_write(ops, ordered=False), tokens,
+                              list(chunk_token_ids))
+                tokens = []
+            chunk_token_ids.clear()
+
+        def collect(writer, wait_all=False):
+            """Take in the results of the chunks that have finished writing (all of them with wait_all)."""
+            for future, documents in writer.finished("master", wait_all):
+                if summary is not None:
+                    # A partly failed chunk only adds the documents it stored to the summary
+                    summary.add_batch([summary_view(document) for document in written_documents(future, documents)])
+                error = future.exception()
+                if error is None:
+                    counts["logs_inserted"] += len(future.result().inserted_ids)
+                else:
+                    write_failures.append(error)
+                    if isinstance(error, BulkWriteError):
+                        counts["logs_inserted"] += error.details.get("nInserted", 0)
+                        counts["log_errors"] += len(error.details.get("writeErrors", []))
+            if use_temp:
+                for future, _ in writer.finished("temp", wait_all):
+                    if future.exception() is not None:
+                        write_failures.append(future.exception())
+            for future, token_ids in writer.finished("tokens", wait_all):
+                error = future.exception()
+                failed = set()
+                if error is None:
+                    token_result = future.result()
+                    counts["tokens_upserted"] += token_result.upserted_count
+                    counts["tokens_modified"] += token_result.modified_count
+                    counts["tokens_matched"] += token_result.matched_count
+                elif isinstance(error, BulkWriteError):
+                    write_failures.append(error)
+                    counts["tokens_upserted"] += error.details.get("nUpserted", 0)
+                    counts["tokens_modified"] += error.details.get("nModified", 0)
+                    counts["tokens_matched"] += error.details.get("nMatched", 0)
+                    token_write_errors.extend(error.details.get("writeErrors", []))
+                    failed = {write_error["index"] for write_error in error.details.get("writeErrors", [])}
+                else:
+                    # The chunk may have been partly applied. A filter entry for a token that was
+                    # not stored only costs a lookup, a missing one would hide a duplicate.
+                    write_failures.append(error)
+                confirmed = [token_id for index, token_id in enumerate(token_ids)
+                             if index not in failed and token_id in unconfirmed_ids]
+                confirmed = list(dict.fromkeys(confirmed))
+                unconfirmed_ids.difference_update(confirmed)
+                token_filter.update(confirmed)
 
         try:
             # Initialize variables for bulk operations
-            bulk_operations = []    #actual master db
             duplicate_tokens = []  # Track duplicates locally
 
-            # Initialize results
-            logs_inserted_count = 0
-            tokens_upserted_count = 0
-            tokens_modified_count = 0
-            token_write_errors = []
+            chunk_size = settings.BULK_WRITE_CHUNK_SIZE
+            chunk_token_ids = []
 
-            process_raw_logs_start = time.perf_counter()
-            for raw_entry in parsed_logs:
-                if not raw_entry.get('Msg_id'):
-                    logger.warning("Log entry missing Msg_id, skipping")
-                    continue
-                log_entry = raw_entry
-                
-                if log_entry['Request_timestamp'] is None:
-                    logger.warning(f"Skipping log entry with Msg_id {log_entry.get('Msg_id', 'N/A')} due to invalid Request_timestamp")
-                    continue
-                flag = 1
-                for field in ['Request_timestamp', 'Response_timestamp']:
-                    if field in log_entry:
-                        try:
-                            if pd.isna(log_entry[field]):
-                                flag = 0
-                            else:
-                                log_entry[field] = log_entry[field].to_pydatetime()
-                        except (AttributeError, TypeError):
-                            log_entry[field] = None
-
-                if(flag == 0): 
-                    continue
+            write_start = time.perf_counter()
+            with BulkWriter(log_targets + ("tokens",), settings.BULK_WRITE_MAX_PENDING_CHUNKS) as writer:
+                for documents in batches:
+                    for raw_entry in documents:
+                        if not raw_entry.get('Msg_id'):
+                            logger.warning("Log entry missing Msg_id, skipping")
+                            continue
+                        log_entry = raw_entry
 
-                log_entry['_processed_at'] = datetime.now(timezone.utc)
-                log_entry['_version'] = 1
-
-                logs_to_insert.append(log_entry)
-
-                # Prepare token data for successful transactions
-                if log_entry.get('Result_of_Transaction') == 1:
-                    for input_token in log_entry.get('Inputs', []):
-                        token_id = input_token.get("id")
-                        
-                        if token_id:
-                            existing_token = tokens_collection.find_one({"tokenId": token_id})
-                            if existing_token:
-                                tokenIds.append(token_id)
-                            
-                            token_occurrence = {
-                            "amount": input_token.get("value", "NA"),
-                            "currency": input_token.get("currency", "NA"),
-                            "serialNo": input_token.get("serialNo", "NA"),
-                            "timestamp": log_entry['Request_timestamp'],
-                            "senderOrg": log_entry.get('SenderOrgId'),
-                            "receiverOrg": log_entry.get('ReceiverOrgId'),
-                            "Transaction_Id": log_entry['Transaction_Id'],
-                            "Msg_id": log_entry['Msg_id'],
-                            "_processed_at": log_entry['_processed_at'],
-                            "_version": 1
-                            }
-                            tokens.append(
-                                UpdateOne(
-                                    {"tokenId": input_token.get("id")},
-                                    {
-                                        "$setOnInsert": {"tokenId": input_token.get("id")},
-                                        "$push": {"occurrences": token_occurrence}
-                                    },
-                                    upsert=True
-                                )
-                            )
-            process_raw_logs_time = time.perf_counter() - process_raw_logs_start
-            print(f"Process raw logs: {process_raw_logs_time:.6f} seconds")
-
-            # Insert logs
-            logs_insert_start = time.perf_counter()
-            if logs_to_insert:
-                result = collection.insert_many(logs_to_insert, ordered=False)
-                logs_inserted_count = len(result.inserted_ids)
-                logger.info(f"Inserted {logs_inserted_count} log entries into main collection.")
-                
-                # Perform the insert many for the temporary collection
-                temp_collection.insert_many(logs_to_insert, ordered=False)
-            else:
-                logger.info("No new log entries to insert into main collection.")
-            logs_insert_time = time.perf_counter() - logs_insert_start
-            print(f"Logs insert: {logs_insert_time:.6f} seconds")
-            
-
-            # Bulk write tokens (tokens collection)
-            tokens_insert_start = time.perf_counter()
-            if tokens:
-                token_result = tokens_collection.bulk_write(tokens, ordered=False)
-                tokens_upserted_count = token_result.upserted_count
-                tokens_modified_count = token_result.modified_count
-                token_write_errors = token_result.bulk_api_result.get('writeErrors', [])
-                logger.info(f"Tokens bulk write: upserted={tokens_upserted_count}, modified={tokens_modified_count}, errors={len(token_write_errors)}")
-            else:
-                logger.info("No token operations to perform.")
-            tokens_insert_time = time.perf_counter() - tokens_insert_start
-            print(f"Tokens insert: {tokens_insert_time:.6f} seconds")
+                        if log_entry['Request_timestamp'] is None:
+                            logger.warning(f"Skipping log entry with Msg_id {log_entry.get('Msg_id', 'N/A')} due to invalid Request_timestamp")
+                            continue
+                        # Timestamps arrive as datetimes from the transaction batch
+                        if log_entry.get('Response_timestamp') is None:
+                            continue
+
+                        # Assigned up front so the master and temp writers, which share
+                        # the document, never race to set it
+                        log_entry['_id'] = ObjectId()
+                        log_entry['_processed_at'] = datetime.now(timezone.utc)
+                        log_entry['_version'] = 1
+
+                        logs_to_insert.append(log_entry)
+                        queued_logs += 1
+                        if len(logs_to_insert) >= chunk_size:
+                            flush_logs(writer)
+                            collect(writer)
+
+                        # Prepare token data for successful transactions
+                        if log_entry.get('Result_of_Transaction') == 1:
+                            for input_token in log_entry.get('Inputs', []):
+                                token_id = input_token.get("id")
+
+                                if token_id:
+                                    chunk_token_ids.append(token_id)
+
+                                    token_occurrence = {
+                                    "amount": input_token.get("value", "NA"),
+                                    "currency": input_token.get("currency", "NA"),
+                                    "serialNo": input_token.get("serialNo", "NA"),
+                                    "timestamp": log_entry['Request_timestamp'],
+                                    "senderOrg": log_entry.get('SenderOrgId'),
+                                    "receiverOrg": log_entry.get('ReceiverOrgId'),
+                                    "Transaction_Id": log_entry['Transaction_Id'],
+                                    "Msg_id": log_entry['Msg_id'],
+                                    "_processed_at": log_entry['_processed_at'],
+                                    "_version": 1
+                                    }
+                                    tokens.append(
+                                        UpdateOne(
+                                            {"tokenId": input_token.get("id")},
+                                            {
+                                                "$setOnInsert": {"tokenId": input_token.get("id")},
+                                                "$push": {"occurrences": token_occurrence}
+                                            },
+                                            upsert=True
+                                        )
+                                    )
+                                    if len(tokens) >= chunk_size:
+                                        flush_tokens(writer, chunk_token_ids)
+                                        collect(writer)
+
+                flush_logs(writer)
+                flush_tokens(writer, chunk_token_ids)
+                collect(writer, wait_all=True)
+            if not queued_logs:
+                logger.info("No logs to store.")
+            write_time = time.perf_counter() - write_start
+            throughput = writer.throughput()
+            logger.info(f"Inserted {counts['logs_inserted']} log entries into main collection.")
+            logger.info(f"Tokens bulk write: upserted={counts['tokens_upserted']}, modified={counts['tokens_modified']}, errors={len(token_write_errors)}")
+            STORE_STEP_SECONDS.observe(write_time, step="write")
+            logger.info(f"Logs and tokens write: {write_time:.6f} seconds")
+            for target, stats in throughput.items():
+                BULK_WRITE_OPERATIONS.inc(stats["operations"], target=target)
+                BULK_WRITE_RATE.set(stats["ops_per_sec"], target=target)
+                logger.info(f"  {target}: {stats['operations']} ops in {stats['chunks']} chunks, {stats['ops_per_sec']:.0f} ops/s")
+
+            # Saved, and duplicates looked up below, even when some writes failed: the
+            # filter only holds confirmed ids and existing tokens are still reported
+            save_token_filter()
+            new_tokens = filter_stats["screened"] - len(tokenIds)
+            token_filter_stats = {
+                "size_bytes": token_filter.size_bytes,
+                "items": token_filter.count,
+                "expected_false_positive_rate": token_filter.false_positive_rate(),
+                "observed_false_positive_rate": filter_stats["false_positives"] / new_tokens if new_tokens else 0.0,
+                "lookups": filter_stats["lookups"],
+                "lookups_avoided": filter_stats["screened"] - filter_stats["lookups"]
+            }
+            TOKEN_FILTER_LOOKUPS.inc(token_filter_stats["lookups"], result="looked_up")
+            TOKEN_FILTER_LOOKUPS.inc(token_filter_stats["lookups_avoided"], result="avoided")
+            logger.info(f"Token filter: {token_filter_stats}")
+
+            unexpected = [failure for failure in write_failures if not isinstance(failure, BulkWriteError)]
+            if unexpected:
+                raise unexpected[0]
 
             find_duplicates_start = time.perf_counter()
-            for id in tokenIds:
-                # Find existing token to collect duplicate info
-                existing_token = tokens_collection.find_one({"tokenId": id})
-                if existing_token:
-                    duplicate_tokens.append({
-                        "tokenId": existing_token.get("tokenId"),
-                        "firstSeen": existing_token.get("occurrences", [{}])[0].get("timestamp") if existing_token.get("occurrences") else None,
-                        "lastSeen": existing_token.get("occurrences", [{}])[-1].get("timestamp") if existing_token.get("occurrences") else None,
-                        "count": len(existing_token.get("occurrences", [])),
-                        "uniqueSenderOrgs": len(set(o.get("senderOrg") for o in existing_token.get("occurrences", []) if o.get("senderOrg"))),
-                        "uniqueReceiverOrgs": len(set(o.get("receiverOrg") for o in existing_token.get("occurrences", []) if o.get("receiverOrg"))),
-                        "totalAmount": sum(float(o.get("amount", 0)) for o in existing_token.get("occurrences", [])),
-                        "occurrences": existing_token.get("occurrences", [])
-                    })
+            duplicate_tokens = LogStorageService.fetch_duplicate_tokens(tokens_collection, tokenIds)
             find_duplicates_time = time.perf_counter() - find_duplicates_start
-            print(f"Find duplicates: {find_duplicates_time:.6f} seconds")
+            STORE_STEP_SECONDS.observe(find_duplicates_time, step="find_duplicates")
+            logger.info(f"Find duplicates: {find_duplicates_time:.6f} seconds")
 
             insert_temptoken_start = time.perf_counter()
             if duplicate_tokens:
                 temptoken_collection.insert_many(duplicate_tokens)
                 logger.info(f"Inserted {len(duplicate_tokens)} duplicate token entries into temporary collection.")
             insert_temptoken_time = time.perf_counter() - insert_temptoken_start
-            print(f"Insert temp tokens: {insert_temptoken_time:.6f} seconds")
+            STORE_STEP_SECONDS.observe(insert_temptoken_time, step="insert_temp_tokens")
+            logger.info(f"Insert temp tokens: {insert_temptoken_time:.6f} seconds")
             total_time = time.perf_counter() - start_time
-            print(f"Total processing time: {total_time:.6f} seconds")
+            logger.info(f"Total processing time: {total_time:.6f} seconds")
+
+            for failure in write_failures:
+                logger.error(f"Bulk write error: {str(failure)}")
+                logger.error(f"Write errors: {failure.details.get('writeErrors', [])}")
 
             return {
                 # "inserted": result.inserted_count,
                 # "updated": result.modified_count,
                 # "matched": result.matched_count,
-                "errors": 0,
-                "total_processed": len(bulk_operations),
-                "tokens_inserted": token_result.upserted_count if tokens else 0,
-                "tokens_updated": token_result.modified_count if tokens else 0,
-                "token_errors": token_result.bulk_api_result.get('writeErrors', []),
-                "token_matched": token_result.matched_count if tokens else 0,
-                "token_total_processed": len(tokens) if tokens else 0,
-                "duplicate_tokens": duplicate_tokens
+                "errors": counts["log_errors"],
+                "error_details": [failure.details for failure in write_failures],
+                "total_processed": queued_logs,
+                "logs_inserted": counts["logs_inserted"],
+                "tokens_inserted": counts["tokens_upserted"],
+                "tokens_updated": counts["tokens_modified"],
+                "token_errors": token_write_errors,
+                "token_matched": counts["tokens_matched"],
+                "token_total_processed": queued_token_operations,
+                "duplicate_tokens": duplicate_tokens,
+                "write_throughput": throughput,
+                "token_filter": token_filter_stats
             }
 
-        except BulkWriteError as e:
-            logger.error(f"Bulk write error: {str(e)}")
-            logger.error(f"Write errors: {e.details.get('writeErrors', [])}")
-            return {
-                "logs_inserted": e.details.get('nInserted', 0),
-                "errors": len(e.details.get('writeErrors', [])),
-                "error_details": e.details,
-                "total_logs_processed": len(parsed_logs),
-                "tokens_upserted": 0, # Cannot determine precise counts for tokens in this block
-                "tokens_modified": 0,
-                "total_tokens_operations": len(tokens),
-                "token_write_errors": []
-            }
         except Exception as e:
             logger.error(f"Unexpected error storing logs: {str(e)}", exc_info=True)
             raise
         
+    @staticmethod
+    def find_existing_token_ids(tokens_collection, token_ids: List[str]) -> List[str]:
+        """Return the distinct ids from token_ids already in the tokens collection, in first-seen order."""
+        unique_ids = list(dict.fromkeys(token_ids))
+        existing = set()
+        for chunk in chunked(unique_ids, settings.TOKEN_PROBE_BATCH_SIZE):
+            # Covered by the unique tokenId index
+            cursor = tokens_collection.find({"tokenId": {"$in": chunk}}, {"tokenId": 1, "_id": 0})
+            existing.update(doc["tokenId"] for doc in cursor)
+        return [token_id for token_id in unique_ids if token_id in existing]
+
+    @staticmethod
+    def fetch_duplicate_tokens(tokens_collection, token_ids: List[str]) -> List[Dict[str, Any]]:
+        """Load the token documents for token_ids in batches and summarise each as a duplicate entry."""
+        duplicate_tokens = []
+        for chunk in chunked(token_ids, settings.TOKEN_PROBE_BATCH_SIZE):
+            documents = {doc["tokenId"]: doc for doc in tokens_collection.find({"tokenId": {"$in": chunk}})}
+            for token_id in chunk:
+                existing_token = documents.get(token_id)
+                if not existing_token:
+                    continue
+                occurrences = existing_token.get("occurrences", [])
+                duplicate_tokens.append({
+                    "tokenId": existing_token.get("tokenId"),
+                    "firstSeen": occurrences[0].get("timestamp") if occurrences else None,
+                    "lastSeen": occurrences[-1].get("timestamp") if occurrences else None,
+                    "count": len(occurrences),
+                    "uniqueSenderOrgs": len(set(o.get("senderOrg") for o in occurrences if o.get("senderOrg"))),
+                    "uniqueReceiverOrgs": len(set(o.get("receiverOrg") for o in occurrences if o.get("receiverOrg"))),
+                    "totalAmount": sum(float(o.get("amount", 0)) for o in occurrences),
+                    "occurrences": occurrences
+                })
+        return duplicate_tokens
+
     @staticmethod
     def get_log_by_msg_id(msg_id: str) -> Dict[str, Any]:
         collection = get_collection()
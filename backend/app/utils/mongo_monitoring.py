@@ -0,0 +1,291 @@
+import contextvars
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from pymongo import monitoring
+from starlette.requests import Request
+from app.core.config import settings
+from app.utils.metrics import registry
+from app.utils.sketches import PERCENTILES, QuantileSketch
+
+logger = logging.getLogger(__name__)
+
+# What the current thread/task is doing on behalf of: "GET /analytics/analytics",
+# "ingest:store", ... Commands are labelled with it when they start.
+_operation = contextvars.ContextVar("mongo_operation", default="-")
+
+# Handshake and heartbeat commands, not work done for the app
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue"}
+# List items kept when redacting, e.g. of an insert's documents
+REDACTED_LIST_ITEMS = 3
+
+@contextmanager
+def mongo_operation(label: str):
+    """Label the MongoDB commands issued inside the block."""
+    token = _operation.set(label)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+def current_operation() -> str:
+    return _operation.get()
+
+async def label_route_operation(request: Request):
+    """Route dependency: label the request's commands with its method and route template."""
+    route = request.scope.get("route")
+    _operation.set(f"{request.method} {getattr(route, 'path', request.url.path)}")
+
+def redact(value):
+    """
+    Shape of a command without its values: keys, operators and $field
+    references are kept, every literal becomes "?" and long lists are cut.
+    """
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(item) for item in value[:REDACTED_LIST_ITEMS]]
+        if len(value) > REDACTED_LIST_ITEMS:
+            items.append(f"... {len(value) - REDACTED_LIST_ITEMS} more")
+        return items
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+class LatencyStats:
+    """Count, failures, total and a quantile sketch of durations in seconds."""
+
+    def __init__(self):
+        self.count = 0
+        self.failures = 0
+        self.total = 0.0
+        self.sketch = QuantileSketch(settings.LATENCY_SKETCH_ACCURACY)
+
+    def add(self, seconds: float, failed: bool = False):
+        self.count += 1
+        self.failures += failed
+        self.total += seconds
+        self.sketch.add(seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "totalSecs": self.total,
+            "meanSecs": self.total / self.count if self.count else None,
+            **{f"{name}Secs": value for name, value in self.sketch.percentiles().items()},
+            "maxSecs": self.sketch.max if self.count else None,
+        }
+
+class MongoMonitor:
+    """Process-wide MongoDB command, connection pool and server statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # (collection, command, operation) -> LatencyStats
+            self.commands = {}
+            self.checkout_wait = LatencyStats()
+            self.checkout_failures = {}
+            self.connections_open = 0
+            self.connections_checked_out = 0
+            self.pool_clears = 0
+            self.servers = {}
+
+    def record_command(self, collection: str, command: str, operation: str, seconds: float, failed: bool):
+        key = (collection, command, operation)
+        with self._lock:
+            stats = self.commands.get(key)
+            if stats is None:
+                stats = self.commands[key] = LatencyStats()
+            stats.add(seconds, failed)
+
+    def record_checkout(self, seconds: float, failure_reason: str = None):
+        with self._lock:
+            self.checkout_wait.add(seconds, failure_reason is not None)
+            if failure_reason is None:
+                self.connections_checked_out += 1
+            else:
+                self.checkout_failures[failure_reason] = self.checkout_failures.get(failure_reason, 0) + 1
+
+    def adjust(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def set_server(self, address: str, server_type: str):
+        with self._lock:
+            if server_type is None:
+                self.servers.pop(address, None)
+            else:
+                self.servers[address] = server_type
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            commands = [
+                {"collection": collection, "command": command, "operation": operation, **stats.to_dict()}
+                for (collection, command, operation), stats in self.commands.items()
+            ]
+            return {
+                "commands": sorted(commands, key=lambda row: row["totalSecs"], reverse=True),
+                "pool": {
+                    "connectionsOpen": self.connections_open,
+                    "connectionsCheckedOut": self.connections_checked_out,
+                    "checkoutWait": self.checkout_wait.to_dict(),
+                    "checkoutFailures": dict(self.checkout_failures),
+                    "clears": self.pool_clears,
+                },
+                "servers": dict(self.servers),
+            }
+
+    def metric_families(self) -> list:
+        """The statistics as metric families; latencies are summaries with the sketch's quantiles."""
+        command_samples, failure_samples = [], []
+        with self._lock:
+            for (collection, command, operation), stats in self.commands.items():
+                labels = {"collection": collection, "command": command, "operation": operation}
+                command_samples.extend(_summary_samples("mongodb_command_duration_seconds", labels, stats))
+                failure_samples.append(("mongodb_command_failures_total", labels, stats.failures))
+            checkout_samples = _summary_samples("mongodb_pool_checkout_wait_seconds", {}, self.checkout_wait)
+            checkout_failures = [
+                ("mongodb_pool_checkout_failures_total", {"reason": reason}, count)
+                for reason, count in self.checkout_failures.items()
+            ]
+            pool = [
+                ("mongodb_pool_connections", {"state": "open"}, self.connections_open),
+                ("mongodb_pool_connections", {"state": "checked_out"}, self.connections_checked_out),
+            ]
+            clears = [("mongodb_pool_clears_total", {}, self.pool_clears)]
+        return [
+            ("mongodb_command_duration_seconds", "summary", "MongoDB command latency", command_samples),
+            ("mongodb_command_failures_total", "counter", "Failed MongoDB commands", failure_samples),
+            ("mongodb_pool_checkout_wait_seconds", "summary", "Wait to check out a pooled connection", checkout_samples),
+            ("mongodb_pool_checkout_failures_total", "counter", "Failed connection checkouts", checkout_failures),
+            ("mongodb_pool_connections", "gauge", "Pooled connections", pool),
+            ("mongodb_pool_clears_total", "counter", "Connection pool clears", clears),
+        ]
+
+def _summary_samples(name: str, labels: dict, stats: LatencyStats) -> list:
+    samples = [
+        (name, {**labels, "quantile": str(q)}, stats.sketch.quantile(q))
+        for q in PERCENTILES.values()
+    ] if stats.count else []
+    samples.append((f"{name}_sum", labels, stats.total))
+    samples.append((f"{name}_count", labels, stats.count))
+    return samples
+
+monitor = MongoMonitor()
+registry.register_collector(monitor.metric_families)
+
+def _command_collection(event: monitoring.CommandStartedEvent) -> str:
+    command = event.command
+    if event.command_name == "getMore":
+        return command.get("collection", "-")
+    target = command.get(event.command_name)
+    return target if isinstance(target, str) else "-"
+
+class CommandLatencyListener(monitoring.CommandListener):
+    """Per command latency by collection, command name and operation; slow commands are logged redacted."""
+
+    def __init__(self, mongo_monitor: MongoMonitor, slow_ms: float):
+        self.monitor = mongo_monitor
+        self.slow_secs = slow_ms / 1000
+        # (request_id, connection_id) -> (collection, operation, command)
+        self._pending = {}
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        self._pending[(event.request_id, event.connection_id)] = (
+            _command_collection(event), _operation.get(), event.command
+        )
+
+    def _finish(self, event, failed: bool):
+        pending = self._pending.pop((event.request_id, event.connection_id), None)
+        if pending is None:
+            return
+        collection, operation, command = pending
+        seconds = event.duration_micros / 1_000_000
+        self.monitor.record_command(collection, event.command_name, operation, seconds, failed)
+        if seconds >= self.slow_secs:
+            shape = json.dumps(redact(dict(command)), default=str)[:settings.MONGODB_SLOW_COMMAND_LOG_CHARS]
+            logger.warning(f"Slow MongoDB {event.command_name} on {collection} ({operation}): "
+                           f"{seconds * 1000:.1f} ms{' (failed)' if failed else ''}: {shape}")
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, True)
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Open and checked out connections, and how long callers wait to check one out."""
+
+    def __init__(self, mongo_monitor: MongoMonitor):
+        self.monitor = mongo_monitor
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.monitor.adjust(pool_clears=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.monitor.adjust(connections_open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.monitor.adjust(connections_open=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.monitor.record_checkout(event.duration or 0.0, str(event.reason))
+
+    def connection_checked_out(self, event):
+        self.monitor.record_checkout(event.duration or 0.0)
+
+    def connection_checked_in(self, event):
+        self.monitor.adjust(connections_checked_out=-1)
+
+class ServerListener(monitoring.ServerListener):
+    """Tracks each server's type and logs when it changes (e.g. a primary stepping down)."""
+
+    def __init__(self, mongo_monitor: MongoMonitor):
+        self.monitor = mongo_monitor
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        address = "%s:%s" % event.server_address
+        previous, new = event.previous_description.server_type_name, event.new_description.server_type_name
+        self.monitor.set_server(address, new)
+        if previous != new:
+            logger.info(f"MongoDB server {address}: {previous} -> {new}")
+
+    def closed(self, event):
+        self.monitor.set_server("%s:%s" % event.server_address, None)
+
+def monitoring_listeners() -> list:
+    """Listeners for the shared MongoClient, or none if monitoring is disabled."""
+    if not settings.MONGODB_MONITORING:
+        return []
+    return [
+        CommandLatencyListener(monitor, settings.MONGODB_SLOW_COMMAND_MS),
+        PoolListener(monitor),
+        ServerListener(monitor),
+    ]
@@ -1,6 +1,14 @@
 import time
 import functools
+import logging
 from typing import Callable, Any, Dict
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+FUNCTION_DURATION = registry.histogram(
+    "function_duration_seconds", "Duration of functions decorated with performance_monitor", ("function", "outcome")
+)
 
 def performance_monitor(func: Callable) -> Callable:
     @functools.wraps(func)
@@ -10,12 +18,14 @@ def performance_monitor(func: Callable) -> Callable:
             result = func(*args, **kwargs)
             end_time = time.perf_counter()
             execution_time = end_time - start_time
-            
-            print(f"[FUNCTION]: {func.__name__}: {execution_time:.6f} seconds")
+
+            FUNCTION_DURATION.observe(execution_time, function=func.__name__, outcome="success")
+            logger.info(f"[FUNCTION]: {func.__name__}: {execution_time:.6f} seconds")
             return result
         except Exception as e:
             end_time = time.perf_counter()
             execution_time = end_time - start_time
-            print(f"{func.__name__} failed after {execution_time:.6f} seconds: {e}")
+            FUNCTION_DURATION.observe(execution_time, function=func.__name__, outcome="error")
+            logger.warning(f"{func.__name__} failed after {execution_time:.6f} seconds: {e}")
             raise
     return wrapper
@@ -0,0 +1,48 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
+from app.core.config import settings
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared process pool, creating it on first use.
+
+    Workers are spawned rather than forked so they never inherit the locks or
+    threads of the API process (MongoDB monitors, the upload thread pool).
+    """
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=settings.PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _EXECUTOR
+
+def run_in_process_pool(func, *args, **kwargs):
+    """
+    Run a function in the process pool executor.
+
+    :param func: The function to run; must be importable at module level.
+    :param args: Positional arguments for the function.
+    :param kwargs: Keyword arguments for the function.
+    :return: Future object representing the execution of the function.
+    """
+    try:
+        return get_process_pool().submit(func, *args, **kwargs)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed); replace the pool instead of failing every later upload
+        reset_process_pool()
+        return get_process_pool().submit(func, *args, **kwargs)
+
+def reset_process_pool():
+    """Shut down the current pool so the next submission starts fresh workers."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            _EXECUTOR = None
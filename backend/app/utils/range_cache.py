@@ -0,0 +1,265 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple
+from app.core.config import settings
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# (start, end) as YYYY-MM-DD strings, both inclusive
+RangeKey = Tuple[str, str]
+
+class MemoryCacheBackend:
+    """In-process LRU store; each API worker keeps its own entries."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, key: RangeKey):
+        """(value, expired) for `key`, or None if it is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None, True
+            self._entries.move_to_end(key)
+            return value, False
+
+    def set(self, key: RangeKey, value: Any, ttl: float) -> int:
+        """Store `value`; returns how many least recently used entries were evicted."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key: RangeKey):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def generation(self) -> int:
+        return self._generation
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation += 1
+
+    def invalidate(self, date_str: str) -> int:
+        """Drop every range containing `date_str`."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] <= date_str <= key[1]]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class MongoCacheBackend:
+    """
+    Store shared by every API worker, kept in a MongoDB collection. Expired
+    entries are removed by a TTL index; entries beyond max_entries are evicted
+    least recently used first. The invalidation generation lives in a counter
+    document of the same collection, so every worker sees every invalidation.
+    """
+
+    GENERATION_ID = "generation"
+    # Matches the cached ranges but not the generation counter
+    ENTRIES = {"start": {"$exists": True}}
+
+    def __init__(self, collection, max_entries: int):
+        self.collection = collection
+        self.max_entries = max_entries
+        collection.create_index("expires_at", expireAfterSeconds=0)
+        collection.create_index([("start", 1), ("end", 1)])
+        collection.create_index("last_used")
+
+    @staticmethod
+    def _id(key: RangeKey) -> str:
+        return f"{key[0]}:{key[1]}"
+
+    def get(self, key: RangeKey):
+        now = datetime.now(timezone.utc)
+        doc = self.collection.find_one_and_update(
+            {"_id": self._id(key)}, {"$set": {"last_used": now}}, projection={"value": 1, "expires_at": 1}
+        )
+        if doc is None:
+            return None
+        # The TTL monitor only runs once a minute
+        if doc["expires_at"].replace(tzinfo=timezone.utc) <= now:
+            self.collection.delete_one({"_id": doc["_id"]})
+            return None, True
+        return json.loads(doc["value"]), False
+
+    def set(self, key: RangeKey, value: Any, ttl: float) -> int:
+        now = datetime.now(timezone.utc)
+        self.collection.replace_one({"_id": self._id(key)}, {
+            "start": key[0],
+            "end": key[1],
+            "value": json.dumps(value),
+            "last_used": now,
+            "expires_at": now + timedelta(seconds=ttl)
+        }, upsert=True)
+        excess = self.collection.count_documents(self.ENTRIES) - self.max_entries
+        if excess <= 0:
+            return 0
+        oldest = [doc["_id"] for doc in self.collection.find(self.ENTRIES, {"_id": 1}).sort("last_used", 1).limit(excess)]
+        return self.collection.delete_many({"_id": {"$in": oldest}}).deleted_count
+
+    def delete(self, key: RangeKey):
+        self.collection.delete_one({"_id": self._id(key)})
+
+    def generation(self) -> int:
+        doc = self.collection.find_one({"_id": self.GENERATION_ID}, {"generation": 1})
+        return doc["generation"] if doc else 0
+
+    def bump_generation(self):
+        self.collection.update_one({"_id": self.GENERATION_ID}, {"$inc": {"generation": 1}}, upsert=True)
+
+    def invalidate(self, date_str: str) -> int:
+        return self.collection.delete_many({"start": {"$lte": date_str}, "end": {"$gte": date_str}}).deleted_count
+
+    def clear(self):
+        # The generation is kept: it must never go back to a value a running request has read
+        self.collection.delete_many(self.ENTRIES)
+
+    def __len__(self):
+        return self.collection.count_documents(self.ENTRIES)
+
+class RangeCache:
+    """
+    Range summary results keyed by their normalized date range, with a TTL,
+    a bounded size and invalidation of every cached range containing a day
+    whose daily summary was rewritten.
+    """
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(start_date, end_date) -> RangeKey:
+        """Normalize datetimes, dates or YYYY-MM-DD strings into a cache key."""
+        return tuple(value if isinstance(value, str) else value.strftime("%Y-%m-%d") for value in (start_date, end_date))
+
+    @property
+    def generation(self) -> int:
+        """
+        Bumped on every invalidation, so a result computed before an ingest
+        finished is not stored. Kept by the backend: with the mongo backend it
+        is shared by every worker.
+        """
+        try:
+            return self.backend.generation()
+        except Exception as e:
+            logger.warning(f"Range cache generation lookup failed: {e}")
+            return -1
+
+    def _is_current(self, generation: Optional[int]) -> bool:
+        # -1 is never current: the generation could not be read when the result was computed
+        return generation is None or generation == self.generation >= 0
+
+    def _count(self, counter: str, amount: int = 1):
+        if amount:
+            with self._lock:
+                self.counters[counter] += amount
+
+    def get(self, start_date, end_date) -> Optional[Any]:
+        try:
+            entry = self.backend.get(self.key(start_date, end_date))
+        except Exception as e:
+            logger.warning(f"Range cache lookup failed: {e}")
+            entry = None
+        if entry is None or entry[1]:
+            self._count("misses")
+            if entry is not None:
+                self._count("expired")
+            return None
+        self._count("hits")
+        return entry[0]
+
+    def set(self, start_date, end_date, value: Any, generation: Optional[int] = None):
+        """Store a result; pass the generation read before computing it to skip results an ingest made stale."""
+        if not self._is_current(generation):
+            return
+        key = self.key(start_date, end_date)
+        try:
+            self._count("evictions", self.backend.set(key, value, self.ttl))
+            # Checked again once stored: an invalidation that ran in between bumped the
+            # generation before deleting, so either it removed this entry or this check sees it
+            if not self._is_current(generation):
+                self.backend.delete(key)
+        except Exception as e:
+            logger.warning(f"Range cache store failed: {e}")
+
+    def invalidate_date(self, date_str: str):
+        """Forget every cached range that contains the day `date_str`."""
+        try:
+            self.backend.bump_generation()
+            self._count("invalidations", self.backend.invalidate(date_str))
+        except Exception as e:
+            logger.error(f"Range cache invalidation failed for {date_str}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["size"] = len(self.backend)
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+_range_cache: Optional[RangeCache] = None
+_range_cache_lock = threading.Lock()
+
+def get_range_cache() -> Optional[RangeCache]:
+    """The process-wide range cache built from settings, or None if caching is disabled."""
+    global _range_cache
+    backend_name = settings.RANGE_CACHE_BACKEND
+    if backend_name == "none":
+        return None
+    if _range_cache is None:
+        with _range_cache_lock:
+            if _range_cache is None:
+                if backend_name == "memory":
+                    backend = MemoryCacheBackend(settings.RANGE_CACHE_MAX_ENTRIES)
+                elif backend_name == "mongo":
+                    from app.repositories.mongo import get_collection
+                    backend = MongoCacheBackend(
+                        get_collection(settings.MONGODB_RANGE_CACHE_COLLECTION_NAME), settings.RANGE_CACHE_MAX_ENTRIES
+                    )
+                else:
+                    raise ValueError(f"Unknown range cache backend: {backend_name}")
+                _range_cache = RangeCache(backend, settings.RANGE_CACHE_TTL_SECS)
+                logger.info(f"Range summary cache: {backend_name}, {settings.RANGE_CACHE_MAX_ENTRIES} entries, "
+                            f"{settings.RANGE_CACHE_TTL_SECS}s TTL")
+    return _range_cache
+
+def _metric_families():
+    if _range_cache is None:
+        return []
+    stats = _range_cache.stats()
+    events = [("range_cache_events_total", {"event": event}, stats[event]) for event in _range_cache.counters]
+    return [
+        ("range_cache_events_total", "counter", "Range summary cache hits, misses, expiries, evictions and invalidations", events),
+        ("range_cache_entries", "gauge", "Range summaries cached", [("range_cache_entries", {}, stats["size"])]),
+    ]
+
+registry.register_collector(_metric_families)
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable
+from starlette.concurrency import run_in_threadpool
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a computation for a key is
+    running, further calls with the same key wait for it and get its result
+    (or exception) instead of starting their own. Nothing is kept once it
+    finishes; this only merges requests that overlap in time.
+
+    The blocking function runs in the threadpool so the event loop stays free
+    while it queries MongoDB. A caller that is cancelled (e.g. the client
+    disconnected) does not cancel the computation for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.counters = {"leaders": 0, "followers": 0}
+
+    async def run(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+            self._count("leaders")
+        else:
+            self._count("followers")
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every waiter was cancelled
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug(f"Coalesced call {key!r} failed: {future.exception()}")
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+        stats["inflight"] = len(self._inflight)
+        return stats
+
+# Shared by the API routes; keys start with the route name so routes never collide
+request_flight = SingleFlight()
+
+def _metric_families():
+    stats = request_flight.stats()
+    calls = [("single_flight_calls_total", {"role": role}, stats[role]) for role in ("leaders", "followers")]
+    return [
+        ("single_flight_calls_total", "counter", "Coalesced requests that ran (leaders) or shared (followers) a computation", calls),
+        ("single_flight_inflight", "gauge", "Computations in flight", [("single_flight_inflight", {}, stats["inflight"])]),
+    ]
+
+registry.register_collector(_metric_families)
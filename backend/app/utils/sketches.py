@@ -0,0 +1,203 @@
+import math
+
+# Reported quantiles, by the name they are returned under
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with a relative error guarantee (DDSketch).
+
+    Values are counted in logarithmically sized bins, so every quantile is
+    reported within `relative_accuracy` of a true value of that rank. Two
+    sketches of the same accuracy merge by adding bin counts: per-day
+    sketches combine into a range sketch whose size depends on the spread of
+    the values, never on how many there were.
+    """
+
+    # Values closer to zero than this are counted as zero
+    MIN_VALUE = 1e-9
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        if value != value:
+            return
+        if value > self.MIN_VALUE:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + count
+        elif value < -self.MIN_VALUE:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + count
+        else:
+            self.zeros += count
+        self.count += count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same relative accuracy can be merged")
+        for bins, other_bins in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_bins.items():
+                bins[key] = bins.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float):
+        """Value at quantile q (0..1), or None if the sketch is empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # Ascending value order: negatives from the largest magnitude down, zeros, positives
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(-self._value(key), self.min)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self._value(key), self.max)
+        return self.max
+
+    def percentiles(self) -> dict:
+        return {name: self.quantile(q) for name, q in PERCENTILES.items()}
+
+    def to_dict(self) -> dict:
+        """BSON-friendly form; bins become parallel key/count lists."""
+        return {
+            "relativeAccuracy": self.relative_accuracy,
+            "count": self.count,
+            "zeros": self.zeros,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "positive": {"keys": list(self.positive), "counts": list(self.positive.values())},
+            "negative": {"keys": list(self.negative), "counts": list(self.negative.values())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relativeAccuracy"])
+        sketch.positive = dict(zip(data["positive"]["keys"], data["positive"]["counts"]))
+        sketch.negative = dict(zip(data["negative"]["keys"], data["negative"]["counts"]))
+        sketch.zeros = data["zeros"]
+        sketch.count = data["count"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+def merge_sketch_groups(groups: dict, data: dict):
+    """Merge serialized sketches keyed by group (e.g. {"1": {...}, "2": {...}}) into `groups`."""
+    for group, sketch_data in data.items():
+        sketch = QuantileSketch.from_dict(sketch_data)
+        if group in groups:
+            groups[group].merge(sketch)
+        else:
+            groups[group] = sketch
+
+class MomentSummary:
+    """
+    Mergeable count, sum, sum of squares, min and max of a set of values.
+
+    Enough for mean, variance, min and max of any union of summarised sets,
+    in constant memory. Summaries rebuilt from stored averages have no sum of
+    squares; merging with one leaves the variance unknown.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        self.total += value * count
+        if self.total_sq is not None:
+            self.total_sq += value * value * count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "MomentSummary"):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq = None if self.total_sq is None or other.total_sq is None else self.total_sq + other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def variance(self):
+        if not self.count or self.total_sq is None:
+            return None
+        # Population variance; clamped since rounding can push it just below zero
+        return max(self.total_sq / self.count - self.mean ** 2, 0.0)
+
+    @property
+    def std(self):
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "sumSq": self.total_sq,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MomentSummary":
+        summary = cls()
+        summary.count = data["count"]
+        summary.total = data["sum"]
+        summary.total_sq = data.get("sumSq")
+        if summary.count:
+            summary.min = data["min"]
+            summary.max = data["max"]
+        return summary
+
+    @classmethod
+    def from_bubble(cls, item: dict) -> "MomentSummary":
+        """Rebuild from a stored bubble entry, which only keeps count, average, min and max."""
+        summary = cls()
+        summary.count = item["frequency"]
+        summary.total = item["avgProcessingTime"] * item["frequency"]
+        summary.total_sq = None
+        summary.min = item["minProcessingTime"]
+        summary.max = item["maxProcessingTime"]
+        return summary
@@ -0,0 +1,87 @@
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Granularity name -> ($dateTrunc unit, binSize)
+GRANULARITIES = {
+    "minute": ("minute", 1),
+    "5min": ("minute", 5),
+    "hour": ("hour", 1),
+    "day": ("day", 1),
+}
+_UNIT_WIDTHS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+
+class TimeBuckets:
+    """
+    Calendar-aligned time buckets of a fixed granularity in a given timezone.
+
+    Buckets start on wall-clock boundaries of `tz` (whole minutes, 5 minute
+    marks, hours or midnights), the same bins MongoDB's $dateTrunc produces,
+    so mongo_expression() buckets on the server and floor() buckets in
+    process with identical results. Bucket starts are naive UTC datetimes,
+    like the dates pymongo returns.
+    """
+
+    def __init__(self, granularity: str = "hour", tz: str = "UTC"):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}', expected one of {', '.join(GRANULARITIES)}")
+        self.granularity = granularity
+        self.unit, self.bin_size = GRANULARITIES[granularity]
+        self.tz_name = tz
+        if tz.upper() == "UTC":
+            self.tz = timezone.utc
+        else:
+            try:
+                self.tz = ZoneInfo(tz)
+            except (ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"Unknown timezone '{tz}'")
+        # Bucket start per minute seen; every boundary falls on a whole minute
+        self._starts = {}
+
+    def mongo_expression(self, field: str = "$Request_timestamp") -> dict:
+        return {"$dateTrunc": {"date": field, "unit": self.unit, "binSize": self.bin_size, "timezone": self.tz_name}}
+
+    def floor(self, value: datetime) -> datetime:
+        """Start of the bucket holding `value`."""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        minute = value.replace(second=0, microsecond=0)
+        start = self._starts.get(minute)
+        if start is None:
+            start = self._starts[minute] = self._floor_minute(minute)
+        return start
+
+    def _floor_minute(self, value: datetime) -> datetime:
+        local = value.replace(tzinfo=timezone.utc).astimezone(self.tz)
+        if self.unit == "minute":
+            local = local.replace(minute=local.minute - local.minute % self.bin_size)
+        elif self.unit == "hour":
+            local = local.replace(minute=0)
+        else:
+            local = local.replace(hour=0, minute=0)
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def end(self, start: datetime) -> datetime:
+        """Start of the bucket after the one starting at `start`."""
+        if self.unit == "day":
+            # Local days are not always 24 hours long
+            local = start.replace(tzinfo=timezone.utc).astimezone(self.tz)
+            return self.day_start(local.date() + timedelta(days=1))
+        return start + self.bin_size * _UNIT_WIDTHS[self.unit]
+
+    def count_between(self, start: datetime, end: datetime) -> int:
+        """Number of buckets from the local midnight `start` up to the local midnight `end`."""
+        if self.unit == "day":
+            # Local days may be 23 or 25 hours long
+            return round((end - start) / timedelta(days=1))
+        width = self.bin_size * _UNIT_WIDTHS[self.unit]
+        return -((start - end) // width)
+
+    def day_start(self, day: date) -> datetime:
+        """Local midnight starting `day`."""
+        return datetime.combine(day, time(), self.tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+    def isoformat(self, value: datetime) -> str:
+        """UTC bucket times stay naive, as stored; other zones are shown in local time with their offset."""
+        if self.tz is timezone.utc:
+            return value.isoformat()
+        return value.replace(tzinfo=timezone.utc).astimezone(self.tz).isoformat()
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+import numpy as np
+
+# Log timestamps are always YYYY-MM-DDTHH:MM:SS.ffffffZ (UTC). Inside the ingest
+# pipeline they stay strings (which sort chronologically) or int64 epoch
+# microseconds; datetimes are only created when documents are built for MongoDB.
+
+NAT = np.datetime64("NaT").astype(np.int64)
+
+def parse_timestamps_us(values) -> np.ndarray:
+    """Decode a column of log timestamps into int64 epoch microseconds; missing values become NAT."""
+    return np.array(
+        [value[:-1] if value else "NaT" for value in values],
+        dtype="datetime64[us]"
+    ).view(np.int64)
+
+def us_to_datetimes(values: np.ndarray) -> np.ndarray:
+    """Object array of naive UTC datetimes (None for NAT), the form BSON stores and returns."""
+    return values.view("datetime64[us]").astype(object)
+
+def timestamp_floor_shift(timestamp: str, seconds: float) -> str:
+    """
+    Whole-second prefix of `timestamp` moved by `seconds`, e.g. '2025-04-25T13:11:19'.
+
+    Full log timestamps compare against it as plain strings.
+    """
+    shifted = datetime.fromisoformat(timestamp[:19]) + timedelta(seconds=seconds)
+    return shifted.isoformat(timespec="seconds")
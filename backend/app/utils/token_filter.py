@@ -0,0 +1,62 @@
+import logging
+import threading
+from app.core.config import settings
+from app.database.database import get_tokens_collection
+from app.utils.bloom_filter import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+# Bloom filter of every tokenId ever stored. A miss means the token is certainly
+# new, so only hits need an exact lookup in the tokens collection.
+_token_filter = None
+_token_filter_lock = threading.Lock()
+
+def build_token_filter() -> BloomFilter:
+    """Rebuild the filter from the tokens collection."""
+    tokens_collection = get_tokens_collection()
+    expected = tokens_collection.estimated_document_count()
+    token_filter = BloomFilter(max(settings.TOKEN_FILTER_CAPACITY, 2 * expected), settings.TOKEN_FILTER_ERROR_RATE)
+    cursor = tokens_collection.find({}, {"tokenId": 1, "_id": 0}).batch_size(10000)
+    token_filter.update(doc["tokenId"] for doc in cursor if doc.get("tokenId"))
+    logger.info(f"Built token filter from {token_filter.count} tokens ({token_filter.size_bytes} bytes)")
+    return token_filter
+
+def load_token_filter() -> BloomFilter:
+    """
+    Load the persisted filter, rebuilding it when the file is missing, unreadable,
+    over capacity, or has seen fewer tokens than the collection holds (written by
+    an older or different instance).
+    """
+    global _token_filter
+    with _token_filter_lock:
+        token_filter = None
+        try:
+            token_filter = BloomFilter.load(settings.TOKEN_FILTER_PATH)
+        except FileNotFoundError:
+            logger.info(f"No token filter at {settings.TOKEN_FILTER_PATH}, building one")
+        except Exception as e:
+            logger.warning(f"Could not load token filter: {e}")
+
+        if token_filter is not None:
+            stored = get_tokens_collection().estimated_document_count()
+            if token_filter.count < stored or token_filter.count > token_filter.capacity:
+                logger.info(f"Token filter is stale ({token_filter.count} items, {stored} tokens stored), rebuilding")
+                token_filter = None
+
+        if token_filter is None:
+            token_filter = build_token_filter()
+            token_filter.save(settings.TOKEN_FILTER_PATH)
+        _token_filter = token_filter
+        return token_filter
+
+def get_token_filter() -> BloomFilter:
+    if _token_filter is None:
+        return load_token_filter()
+    return _token_filter
+
+def save_token_filter():
+    if _token_filter is not None:
+        try:
+            _token_filter.save(settings.TOKEN_FILTER_PATH)
+        except Exception as e:
+            logger.error(f"Error saving token filter: {str(e)}")
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from app.utils.timestamps import NAT, parse_timestamps_us, us_to_datetimes
+
+REQUEST_COLUMNS = [
+    "Msg_id", "Request_timestamp", "SenderOrgId", "ReceiverOrgId", "Transaction_Id", "Amount",
+    "Req_Tot_Amount", "Req_input_amt_list", "Output_amt_list", "Inputs", "Outputs"
+]
+RESPONSE_COLUMNS = [
+    "Response_timestamp", "Type_Of_Transaction", "Operation", "Responsetotamount", "Resptokens",
+    "Result_of_Transaction", "ErrorCode", "ErrorMsg"
+]
+DERIVED_COLUMNS = ["Time_to_Transaction_secs", "input_amount", "NumberOfInputs", "NumberOfOutputs"]
+COLUMNS = REQUEST_COLUMNS + RESPONSE_COLUMNS + DERIVED_COLUMNS
+
+TIMESTAMP_COLUMNS = {"Request_timestamp", "Response_timestamp"}
+# Columns that hold nested values; a missing scalar anywhere else drops the row
+NESTED_COLUMNS = {"Req_input_amt_list", "Output_amt_list", "Inputs", "Outputs", "Resptokens"}
+
+class TransactionBatch:
+    """
+    Column-oriented set of paired transactions.
+
+    Transactions are appended column by column as the correlator closes them;
+    finalize() computes the derived columns over whole arrays and drops
+    incomplete rows, after which to_documents() builds the MongoDB documents
+    in a single pass.
+    """
+
+    def __init__(self):
+        self.columns = {name: [] for name in REQUEST_COLUMNS + RESPONSE_COLUMNS}
+        self.size = 0
+        self.finalized = False
+
+    def __len__(self):
+        return self.size
+
+    def append(self, transaction: dict):
+        for name, values in self.columns.items():
+            values.append(transaction.get(name))
+        self.size += 1
+
+    def finalize(self) -> "TransactionBatch":
+        if self.finalized:
+            return self
+        columns = self.columns
+
+        request_us = parse_timestamps_us(columns["Request_timestamp"])
+        response_us = parse_timestamps_us(columns["Response_timestamp"])
+        complete = (request_us != NAT) & (response_us != NAT)
+
+        columns["Request_timestamp"] = request_us
+        columns["Response_timestamp"] = response_us
+        columns["Time_to_Transaction_secs"] = np.where(complete, (response_us - request_us) / 1e6 * 1000, 0.0)
+        columns["Result_of_Transaction"] = (np.array(columns["Result_of_Transaction"], dtype=object) == "SUCCESS").astype(np.int64)
+        columns["input_amount"] = np.array(columns["Req_Tot_Amount"], dtype=np.float64)
+        columns["NumberOfInputs"] = np.fromiter(
+            (len(x) if isinstance(x, list) else 0 for x in columns["Req_input_amt_list"]), dtype=np.int64, count=self.size)
+        columns["NumberOfOutputs"] = np.fromiter(
+            (len(x) if isinstance(x, list) else 0 for x in columns["Output_amt_list"]), dtype=np.int64, count=self.size)
+
+        # Same rows the DataFrame dropna() used to discard
+        keep = complete.copy()
+        for name, values in columns.items():
+            if name in NESTED_COLUMNS or name in DERIVED_COLUMNS or name in TIMESTAMP_COLUMNS:
+                continue
+            keep &= pd.notna(np.fromiter(values, dtype=object, count=len(values)))
+        keep &= ~np.isnan(columns["input_amount"])
+
+        if not keep.all():
+            for name, values in columns.items():
+                if isinstance(values, list):
+                    columns[name] = [value for value, kept in zip(values, keep) if kept]
+                else:
+                    columns[name] = values[keep]
+            self.size = int(keep.sum())
+
+        self.columns = {name: columns[name] for name in COLUMNS}
+        self.finalized = True
+        return self
+
+    def to_documents(self) -> list:
+        """Materialise one document per transaction with native Python values."""
+        self.finalize()
+        values = []
+        for name, col in self.columns.items():
+            if name in TIMESTAMP_COLUMNS:
+                # Epoch microseconds become datetimes only here, at the BSON boundary
+                col = us_to_datetimes(col)
+            elif isinstance(col, np.ndarray) and col.dtype != object:
+                col = col.tolist()
+            values.append(col)
+        return [dict(zip(COLUMNS, row)) for row in zip(*values)]
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class JsonRecordWriter:
+    """
+    Write documents, one batch at a time, as a single JSON array of records
+    with timestamps as epoch milliseconds; nothing but the current batch is
+    held in memory.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "w")
+        self._file.write("[")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.write("]")
+        self._file.close()
+        return False
+
+    def write(self, documents: list):
+        for document in documents:
+            if self.count:
+                self._file.write(",")
+            json.dump(document, self._file, default=_json_default)
+            self.count += 1
@@ -0,0 +1,126 @@
+from collections import OrderedDict
+import logging
+from app.utils.timestamps import timestamp_floor_shift
+
+logger = logging.getLogger(__name__)
+
+class TransactionCorrelator:
+    """
+    Pair request and response events by message id.
+
+    A request is held in a pending table under its msgId until the response
+    carrying the same reqMsgId arrives; a response seen before its request is
+    held the same way. Both tables are bounded: entries older than `timeout`
+    seconds (in log time, against the latest timestamp seen) are evicted, and
+    when a table is full its oldest entry is evicted. Evicted and leftover
+    entries never produce a transaction.
+
+    There is a single log-time clock, so events from several files must be fed
+    merged by timestamp (as iter_zip_events does); a file read ahead of the
+    others would push the clock past their pending entries and evict them.
+    """
+
+    def __init__(self, max_pending: int, timeout: float):
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending_requests = OrderedDict()
+        self.pending_responses = OrderedDict()
+        # Latest timestamp seen and the oldest one still allowed to wait; both are
+        # log timestamp strings, which order chronologically, so events are never
+        # decoded here
+        self.watermark = ""
+        self.deadline = ""
+        self.stats = {
+            "paired": 0,
+            "duplicate_requests": 0,
+            "duplicate_responses": 0,
+            "unkeyed_responses": 0,
+            "evicted_requests": 0,
+            "evicted_responses": 0,
+            "unmatched_requests": 0,
+            "unmatched_responses": 0
+        }
+
+    def _hold(self, table: OrderedDict, key: str, timestamp: str, entry: dict, evicted_stat: str):
+        if len(table) >= self.max_pending:
+            table.popitem(last=False)
+            self.stats[evicted_stat] += 1
+        table[key] = (timestamp, entry)
+
+    def _expire(self, table: OrderedDict, evicted_stat: str):
+        # Tables are in arrival order, so only the head needs checking
+        while table:
+            timestamp, _ = next(iter(table.values()))
+            if timestamp >= self.deadline:
+                break
+            table.popitem(last=False)
+            self.stats[evicted_stat] += 1
+
+    def add(self, event: dict):
+        """Feed one event; return the completed transaction if it closes a pair, else None."""
+        if "data" not in event:
+            return None
+
+        timestamp = event["timestamp"]
+        if timestamp > self.watermark:
+            # The deadline only moves when the watermark enters a new second
+            if timestamp[:19] != self.watermark[:19]:
+                self.deadline = timestamp_floor_shift(timestamp, -self.timeout)
+            self.watermark = timestamp
+            self._expire(self.pending_requests, "evicted_requests")
+            self._expire(self.pending_responses, "evicted_responses")
+
+        if event["is_request"]:
+            msg_id = event["msg_id"]
+            request = {
+                "Msg_id": msg_id,
+                "Request_timestamp": event["timestamp"],
+                **event["data"]
+            }
+            held = self.pending_responses.pop(msg_id, None)
+            if held is not None:
+                return self._complete(request, held[1])
+            if msg_id in self.pending_requests:
+                # Retransmitted request: the first copy stays authoritative
+                self.stats["duplicate_requests"] += 1
+                return None
+            self._hold(self.pending_requests, msg_id, timestamp, request, "evicted_requests")
+            return None
+
+        req_msg_id = event["req_msg_id"]
+        if not req_msg_id:
+            self.stats["unkeyed_responses"] += 1
+            return None
+        response = {
+            "Response_timestamp": event["timestamp"],
+            **event["data"]
+        }
+        held = self.pending_requests.pop(req_msg_id, None)
+        if held is not None:
+            return self._complete(held[1], response)
+        if req_msg_id in self.pending_responses:
+            self.stats["duplicate_responses"] += 1
+            return None
+        self._hold(self.pending_responses, req_msg_id, timestamp, response, "evicted_responses")
+        return None
+
+    def _complete(self, request: dict, response: dict) -> dict:
+        self.stats["paired"] += 1
+        request.update(response)
+        return request
+
+    def pair(self, events):
+        """Yield completed transactions from a stream of events, in completion order."""
+        for event in events:
+            transaction = self.add(event)
+            if transaction is not None:
+                yield transaction
+        self.finish()
+
+    def finish(self):
+        """Drop whatever is still pending once the stream is exhausted."""
+        self.stats["unmatched_requests"] += len(self.pending_requests)
+        self.stats["unmatched_responses"] += len(self.pending_responses)
+        self.pending_requests.clear()
+        self.pending_responses.clear()
+        logger.info(f"Transaction correlation: {self.stats}")
@@ -0,0 +1,21 @@
+import math
+import pytest
+from app.utils.bucketing import BucketEdges
+
+@pytest.mark.parametrize("edges", [BucketEdges.log(10), BucketEdges.linear(4, 0, 100), BucketEdges.custom([0, 1, 2.5, 40])])
+def test_every_edge_starts_its_bucket_and_the_last_edge_closes_the_last(edges):
+    values = edges.edges
+    assert edges.indices(values).tolist() == list(range(len(edges))) + [len(edges) - 1]
+
+def test_values_between_edges_fall_in_the_lower_bucket():
+    edges = BucketEdges.log(3)  # 1, 10, 100, 1000
+
+    assert edges.indices([1.5, 9.999, 10.0001, 999.9]).tolist() == [0, 0, 1, 2]
+
+def test_values_outside_the_edges_and_nan_have_no_bucket():
+    edges = BucketEdges.log(3)
+
+    assert edges.indices([0.5, -1, 1000.0001, math.inf, math.nan]).tolist() == [-1] * 5
+
+def test_indices_of_an_empty_column():
+    assert BucketEdges.log(3).indices([]).tolist() == []
@@ -0,0 +1,51 @@
+import zipfile
+import pytest
+from app.core.config import settings
+from app.services.task_manager import create_task
+from app.services.zip_processor import iter_zip_events
+from app.utils.log_parser import combine_log_events
+
+def request_record(timestamp: str, msg_id: str) -> str:
+    return (
+        f'{timestamp} INFO attestation::api::handlers::req_issue_token: Request received\n'
+        f'<ReqDetails msgId="{msg_id}">\n'
+        f'  <Detail name="senderOrgId" value="ORG1"/>\n'
+        f'  <Detail name="receiverOrgId" value="ORG2"/>\n'
+        f'  <Detail name="transactionId" value="TX{msg_id}"/>\n'
+        f'  <Amount value="10.0" curr="INR">\n'
+        f'</ReqDetails>\n'
+    )
+
+def response_record(timestamp: str, msg_id: str) -> str:
+    return (
+        f'{timestamp} INFO attestation::api::handlers::res: Response sent\n'
+        f'<ResDetails type="LOAD" Operation="MERGE">\n'
+        f'<Head msgId="R{msg_id}"/>\n'
+        f'<Resp reqMsgId="{msg_id}" result="SUCCESS"/>\n'
+        f'</ResDetails>\n'
+    )
+
+@pytest.fixture
+def split_archive(tmp_path):
+    """Requests hours apart in one member, their responses in the next."""
+    path = tmp_path / "split.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("logs/requests.log",
+                         request_record("2025-04-25T00:00:00.000000Z", "M1")
+                         + request_record("2025-04-25T05:00:00.000000Z", "M2"))
+        archive.writestr("logs/responses.log",
+                         response_record("2025-04-25T00:00:01.000000Z", "M1")
+                         + response_record("2025-04-25T05:00:01.000000Z", "M2"))
+    return str(path)
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_requests_pair_with_responses_in_a_later_file(split_archive, monkeypatch, workers):
+    monkeypatch.setattr(settings, "PARSE_WORKERS", workers)
+    monkeypatch.setattr(settings, "PARALLEL_PARSE_MIN_BYTES", 0)
+    monkeypatch.setattr(settings, "CORRELATION_TIMEOUT_SECS", 3600)
+    create_task("cross-file", "test")
+
+    batches = combine_log_events(iter_zip_events("cross-file", split_archive, {"logs": 0, "files": 0, "bytes": 0}))
+
+    documents = [document for batch in batches for document in batch.to_documents()]
+    assert sorted(document["Msg_id"] for document in documents) == ["M1", "M2"]
@@ -0,0 +1,40 @@
+import pytest
+from app.utils.log_parser import parse_log_chunks
+
+LOG = (
+    b'2025-04-25T14:11:19.206712Z INFO attestation::api::handlers::req_issue_token: Request received\n'
+    b'<ReqDetails msgId="M1">\n'
+    b'  <Detail name="transactionId" value="TX1"/>\n'
+    b'</ReqDetails>\n'
+    b'2025-04-25T14:11:20.000001Z INFO attestation::api::handlers::res: Response sent\n'
+    b'<Resp reqMsgId="M1" result="SUCCESS"/>\n'
+    b'2025-04-25T14:11:21.5Z WARN attestation::api::handlers::req_issue_token: caf\xc3\xa9\n'
+)
+
+def split_at(data: bytes, *offsets: int):
+    bounds = [0, *offsets, len(data)]
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+def test_whole_log_yields_every_record():
+    records = list(parse_log_chunks([LOG]))
+
+    assert [record["timestamp"] for record in records] == [
+        "2025-04-25T14:11:19.206712Z", "2025-04-25T14:11:20.000001Z", "2025-04-25T14:11:21.5Z"
+    ]
+    assert [record["level"] for record in records] == ["INFO", "INFO", "WARN"]
+    assert records[0]["module"] == "attestation::api::handlers::req_issue_token"
+    assert records[0]["message"].startswith("Request received\n<ReqDetails")
+    assert records[2]["message"] == "café"
+
+@pytest.mark.parametrize("offset", range(1, len(LOG)))
+def test_record_split_across_two_chunks(offset):
+    assert list(parse_log_chunks(split_at(LOG, offset))) == list(parse_log_chunks([LOG]))
+
+def test_record_spanning_many_chunks():
+    # One byte at a time: every timestamp and multi-byte character is cut somewhere
+    assert list(parse_log_chunks([LOG[i:i + 1] for i in range(len(LOG))])) == list(parse_log_chunks([LOG]))
+
+def test_empty_chunks_and_leading_garbage_are_ignored():
+    chunks = [b"", b"no header here\n", *split_at(LOG, 30, 31), b""]
+
+    assert list(parse_log_chunks(chunks)) == list(parse_log_chunks([LOG]))
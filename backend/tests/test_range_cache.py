@@ -0,0 +1,67 @@
+import time
+import pytest
+from app.utils.range_cache import MemoryCacheBackend, MongoCacheBackend, RangeCache
+
+@pytest.fixture
+def cache_collection():
+    mongomock = pytest.importorskip("mongomock")
+    return mongomock.MongoClient().db.range_cache
+
+@pytest.fixture(params=["memory", "mongo"])
+def cache(request):
+    if request.param == "memory":
+        return RangeCache(MemoryCacheBackend(max_entries=2), ttl=60)
+    return RangeCache(MongoCacheBackend(request.getfixturevalue("cache_collection"), max_entries=2), ttl=60)
+
+def test_invalidating_a_day_drops_only_the_ranges_containing_it(cache):
+    cache.set("2025-04-01", "2025-04-30", {"total": 1})
+    cache.set("2025-05-01", "2025-05-31", {"total": 2})
+
+    cache.invalidate_date("2025-04-15")
+
+    assert cache.get("2025-04-01", "2025-04-30") is None
+    assert cache.get("2025-05-01", "2025-05-31") == {"total": 2}
+
+def test_result_computed_before_an_invalidation_is_not_stored(cache):
+    generation = cache.generation
+    cache.invalidate_date("2025-04-15")
+
+    cache.set("2025-04-01", "2025-04-30", {"total": 1}, generation)
+
+    assert cache.get("2025-04-01", "2025-04-30") is None
+    cache.set("2025-04-01", "2025-04-30", {"total": 1}, cache.generation)
+    assert cache.get("2025-04-01", "2025-04-30") == {"total": 1}
+
+def test_least_recently_used_range_is_evicted(cache):
+    # MongoDB keeps last_used to the millisecond, so the uses must be told apart
+    cache.set("2025-04-01", "2025-04-01", 1)
+    time.sleep(0.005)
+    cache.set("2025-04-02", "2025-04-02", 2)
+    time.sleep(0.005)
+    cache.get("2025-04-01", "2025-04-01")
+    time.sleep(0.005)
+
+    cache.set("2025-04-03", "2025-04-03", 3)
+
+    assert cache.get("2025-04-02", "2025-04-02") is None
+    assert cache.get("2025-04-01", "2025-04-01") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_expired_range_is_a_miss(cache):
+    cache.ttl = 0
+    cache.set("2025-04-01", "2025-04-01", 1)
+
+    # MongoDB's TTL monitor may already have removed it, so it need not count as expired
+    assert cache.get("2025-04-01", "2025-04-01") is None
+    assert cache.stats()["misses"] == 1
+
+def test_workers_sharing_a_mongo_cache_see_each_others_invalidations(cache_collection):
+    worker_a = RangeCache(MongoCacheBackend(cache_collection, max_entries=10), ttl=60)
+    worker_b = RangeCache(MongoCacheBackend(cache_collection, max_entries=10), ttl=60)
+    generation = worker_a.generation
+
+    worker_b.invalidate_date("2025-04-15")
+    worker_a.set("2025-04-01", "2025-04-30", {"total": 1}, generation)
+
+    assert worker_b.get("2025-04-01", "2025-04-30") is None
+    assert len(worker_a.backend) == 0
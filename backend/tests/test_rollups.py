@@ -0,0 +1,91 @@
+import math
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from app.api.analytics_service import aggregate_overall_summary, save_daily_summary
+from app.services.daily_summary import DailySummaryAccumulator
+from app.services.range_summary import RANGE_SUMMARY_PROJECTION, RangeSummaryAccumulator
+from app.services.rollups import rebuild_rollups, summarize_range
+
+mongomock = pytest.importorskip("mongomock")
+
+FIRST_DAY, LAST_DAY = date(2025, 3, 20), date(2025, 5, 10)
+
+def transaction(rng: random.Random, day: date) -> dict:
+    error = rng.choice(["Success"] * 4 + ["E1", "E2"])
+    return {
+        "Type_Of_Transaction": rng.choice(["LOAD", "TRANSFER"]),
+        "Operation": rng.choice(["SPLIT", "MERGE"]),
+        "ErrorCode": error,
+        "Result_of_Transaction": 1 if error == "Success" else 0,
+        "input_amount": rng.choice([5.0, 50.0, 500.0, 5000.0]),
+        "Req_Tot_Amount": 100.0,
+        "Time_to_Transaction_secs": rng.uniform(0.1, 5),
+        "NumberOfInputs": rng.randint(1, 3),
+        "NumberOfOutputs": rng.randint(1, 3),
+        "Request_timestamp": datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randint(0, 1439)),
+        "SenderOrgId": rng.choice(["ORG1", "ORG2"]),
+        "ReceiverOrgId": rng.choice(["ORG1", "ORG2"]),
+    }
+
+@pytest.fixture(scope="module")
+def collections():
+    """Daily summaries for every day from FIRST_DAY to LAST_DAY, ingested one by one."""
+    rng = random.Random(7)
+    database = mongomock.MongoClient().db
+    daily, overall = database.daily, database.overall
+    day = FIRST_DAY
+    while day <= LAST_DAY:
+        summary = DailySummaryAccumulator()
+        summary.add_batch([transaction(rng, day) for _ in range(30)])
+        aggregate_overall_summary(save_daily_summary(summary, daily, []), daily, overall)
+        day += timedelta(days=1)
+    return daily, overall
+
+def direct_summary(daily, start_date: str, end_date: str) -> dict:
+    summary = RangeSummaryAccumulator()
+    for doc in daily.find({"date": {"$gte": start_date, "$lte": end_date}}, RANGE_SUMMARY_PROJECTION).sort("date", 1):
+        summary.add(doc)
+    return summary.build(start_date, end_date)
+
+def assert_same(actual, expected, path="summary"):
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and actual.keys() == expected.keys(), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert isinstance(actual, list) and len(actual) == len(expected), path
+        for index, (a, e) in enumerate(zip(actual, expected)):
+            assert_same(a, e, f"{path}[{index}]")
+    elif isinstance(expected, float):
+        # Rollups add the same values in a different order
+        assert math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-9), path
+    else:
+        assert actual == expected, path
+
+@pytest.mark.parametrize("start_date, end_date", [
+    ("2025-03-20", "2025-05-10"),  # everything: the "all" node
+    ("2025-03-31", "2025-05-04"),  # whole weeks and the whole of April
+    ("2025-04-01", "2025-04-30"),  # one month node
+    ("2025-03-22", "2025-04-09"),  # edge days around a week node
+    ("2025-04-15", "2025-04-15"),  # a single day
+])
+def test_rollups_match_a_direct_range_summary(collections, start_date, end_date):
+    daily, overall = collections
+
+    assert_same(summarize_range(daily, overall, start_date, end_date), direct_summary(daily, start_date, end_date))
+
+def test_rebuilt_rollups_match_incrementally_updated_ones(collections):
+    daily, overall = collections
+    rebuilt = mongomock.MongoClient().db.overall
+
+    rebuild_rollups(daily, rebuilt)
+
+    for node in overall.find():
+        assert_same(rebuilt.find_one({"_id": node["_id"]}, {"updated_at": 0}),
+                    {key: value for key, value in node.items() if key != "updated_at"}, node["_id"])
+
+def test_range_without_daily_summaries_has_no_summary(collections):
+    daily, overall = collections
+
+    assert summarize_range(daily, overall, "2024-01-01", "2024-12-31") is None
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from app.utils.single_flight import SingleFlight
+
+def blocking_call(release: threading.Event, calls: list, result):
+    calls.append(result)
+    release.wait(5)
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+async def run_together(flight: SingleFlight, release: threading.Event, *calls):
+    tasks = [asyncio.ensure_future(flight.run(key, *args)) for key, *args in calls]
+    # Let every caller join before the computation is allowed to finish
+    await asyncio.sleep(0.05)
+    release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+def test_identical_concurrent_calls_share_one_computation():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    results = asyncio.run(run_together(flight, release, *[("key", blocking_call, release, calls, 42)] * 3))
+
+    assert results == [42, 42, 42]
+    assert calls == [42]
+    assert flight.stats() == {"leaders": 1, "followers": 2, "inflight": 0}
+
+def test_different_keys_run_separately():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    results = asyncio.run(run_together(flight, release, ("a", blocking_call, release, calls, 1),
+                                       ("b", blocking_call, release, calls, 2)))
+
+    assert results == [1, 2]
+    assert sorted(calls) == [1, 2]
+
+def test_every_caller_gets_the_exception():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+    error = ValueError("boom")
+
+    results = asyncio.run(run_together(flight, release, *[("key", blocking_call, release, calls, error)] * 2))
+
+    assert results == [error, error]
+    assert len(calls) == 1
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.run("key", blocking_call, release, calls, 7))
+        second = asyncio.ensure_future(flight.run("key", blocking_call, release, calls, 7))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        release.set()
+        return await second, first.cancelled()
+
+    assert asyncio.run(scenario()) == (7, True)
+    assert calls == [7]
+
+def test_nothing_is_kept_once_a_call_finishes():
+    flight = SingleFlight()
+
+    async def scenario():
+        return [await flight.run("key", lambda value=value: value) for value in (1, 2)]
+
+    assert asyncio.run(scenario()) == [1, 2]
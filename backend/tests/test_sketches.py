@@ -0,0 +1,91 @@
+import math
+import random
+import statistics
+import pytest
+from app.utils.sketches import PERCENTILES, MomentSummary, QuantileSketch
+
+ACCURACY = 0.01
+
+def exact_quantile(sorted_values: list, q: float) -> float:
+    # The rank QuantileSketch.quantile reports
+    return sorted_values[math.floor(q * (len(sorted_values) - 1))]
+
+def sketch_of(values) -> QuantileSketch:
+    sketch = QuantileSketch(ACCURACY)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+def day_values(seed: int) -> list:
+    rng = random.Random(seed)
+    values = [rng.lognormvariate(0, 2) for _ in range(2000)]
+    values += [-rng.expovariate(1) for _ in range(200)] + [0.0] * 50
+    return values
+
+@pytest.mark.parametrize("q", [0, 0.01, 0.25, *PERCENTILES.values(), 1])
+def test_merged_sketches_match_exact_quantiles(q):
+    days = [day_values(seed) for seed in range(7)]
+    merged = QuantileSketch(ACCURACY)
+    for values in days:
+        merged.merge(sketch_of(values))
+
+    everything = sorted(value for values in days for value in values)
+    expected = exact_quantile(everything, q)
+
+    assert merged.count == len(everything)
+    assert merged.quantile(q) == pytest.approx(expected, rel=ACCURACY, abs=QuantileSketch.MIN_VALUE)
+
+def test_merge_equals_a_single_sketch_of_all_values():
+    days = [day_values(seed) for seed in range(3)]
+    merged = sketch_of(days[2]).merge(sketch_of(days[0])).merge(sketch_of(days[1]))
+    single = sketch_of(value for values in days for value in values)
+
+    assert merged.percentiles() == single.percentiles()
+    assert (merged.count, merged.zeros, merged.min, merged.max) == (single.count, single.zeros, single.min, single.max)
+
+def test_serialized_sketch_merges_like_the_original():
+    sketch = sketch_of(day_values(1))
+    restored = QuantileSketch.from_dict(sketch.to_dict())
+
+    assert restored.percentiles() == sketch.percentiles()
+    assert restored.merge(sketch_of(day_values(2))).percentiles() == \
+           sketch_of(day_values(1) + day_values(2)).percentiles()
+
+def test_sketches_of_different_accuracy_do_not_merge():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+def test_empty_sketch_has_no_quantiles():
+    assert QuantileSketch().percentiles() == {name: None for name in PERCENTILES}
+
+def moments_of(values) -> MomentSummary:
+    moments = MomentSummary()
+    for value in values:
+        moments.add(value)
+    return moments
+
+def test_merged_moments_match_exact_statistics():
+    days = [day_values(seed) for seed in range(5)]
+    merged = MomentSummary()
+    for values in days:
+        merged.merge(moments_of(values))
+
+    everything = [value for values in days for value in values]
+    assert merged.count == len(everything)
+    assert merged.mean == pytest.approx(statistics.fmean(everything))
+    assert merged.std == pytest.approx(statistics.pstdev(everything))
+    assert (merged.min, merged.max) == (min(everything), max(everything))
+
+def test_serialized_moments_round_trip():
+    moments = moments_of(day_values(3))
+
+    assert MomentSummary.from_dict(moments.to_dict()).to_dict() == moments.to_dict()
+    assert MomentSummary.from_dict(MomentSummary().to_dict()).mean is None
+
+def test_moments_rebuilt_from_a_bubble_have_no_variance():
+    bubble = {"frequency": 4, "avgProcessingTime": 2.5, "minProcessingTime": 1, "maxProcessingTime": 4}
+    merged = MomentSummary.from_bubble(bubble).merge(moments_of([1, 2]))
+
+    assert merged.count == 6
+    assert merged.mean == pytest.approx(13 / 6)
+    assert merged.variance is None
@@ -0,0 +1,58 @@
+import struct
+import pytest
+from app.core.config import settings
+from app.utils import token_filter
+from app.utils.bloom_filter import BloomFilter
+
+def filled_filter(count: int = 1000) -> BloomFilter:
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    bloom.update(f"tok{i}" for i in range(count))
+    return bloom
+
+def test_saved_filter_loads_with_the_same_contents(tmp_path):
+    path = str(tmp_path / "filter.bin")
+    saved = filled_filter()
+    saved.save(path)
+
+    loaded = BloomFilter.load(path)
+
+    assert (loaded.capacity, loaded.error_rate, loaded.num_bits, loaded.num_hashes, loaded.count) == \
+           (saved.capacity, saved.error_rate, saved.num_bits, saved.num_hashes, saved.count)
+    assert loaded.bits == saved.bits
+    assert all(f"tok{i}" in loaded for i in range(1000))
+    # Nothing that was never added may be certain to be present; a few false positives are allowed
+    assert sum(f"other{i}" in loaded for i in range(1000)) < 50
+
+def test_filter_in_the_old_format_is_rejected(tmp_path):
+    path = tmp_path / "filter.bin"
+    # BLOOM001 headers had no capacity field
+    path.write_bytes(struct.pack("<8sQIQ", b"BLOOM001", 64, 3, 10) + struct.pack("<d", 0.01) + bytes(8))
+
+    with pytest.raises(ValueError, match="current format"):
+        BloomFilter.load(str(path))
+
+def test_truncated_filter_is_rejected(tmp_path):
+    path = tmp_path / "filter.bin"
+    filled_filter().save(str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+
+    with pytest.raises(ValueError, match="truncated"):
+        BloomFilter.load(str(path))
+
+def test_unreadable_filter_is_rebuilt_from_the_tokens_collection(tmp_path, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    tokens = mongomock.MongoClient().db.tokens
+    tokens.insert_many([{"tokenId": f"tok{i}"} for i in range(100)])
+    path = tmp_path / "filter.bin"
+    path.write_bytes(b"BLOOM001" + bytes(64))
+    monkeypatch.setattr(settings, "TOKEN_FILTER_PATH", str(path))
+    monkeypatch.setattr(settings, "TOKEN_FILTER_CAPACITY", 1000)
+    monkeypatch.setattr(token_filter, "get_tokens_collection", lambda: tokens)
+    monkeypatch.setattr(token_filter, "_token_filter", None)
+
+    rebuilt = token_filter.load_token_filter()
+
+    assert rebuilt.count == 100
+    assert all(f"tok{i}" in rebuilt for i in range(100))
+    # The rebuilt filter replaced the unreadable file
+    assert BloomFilter.load(str(path)).count == 100